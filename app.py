@@ -1,16 +1,58 @@
-from flask import Flask, render_template, redirect, url_for, request, flash, session
+from flask import Flask, render_template, redirect, url_for, request, flash, session, Response, stream_with_context, abort, jsonify
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import text, func, case, tuple_, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+import click
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
-from pytz import timezone
-import pytz
+from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
+import csv
+import io
+import json
+import gzip
+import hashlib
+import time
+from functools import wraps, lru_cache
+import heapq
+from collections import namedtuple
+from cache import LocalCache, cache_from_config
+from metrics import Metrics
+from events import SpotEventBroker
+import billing
+import bulk
 
 app = Flask(__name__)
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///database.sqlite3'
 app.config['SECRET_KEY'] = 'your_secret_key'
+app.config['HISTORY_PAGE_SIZE'] = 20
+app.config['SEARCH_PAGE_SIZE'] = 20
+app.config['CACHE_BACKEND'] = 'local'
+app.config['CACHE_TTL'] = 60
+app.config['CACHE_MAXSIZE'] = 1024
+app.config['SQLITE_TUNING'] = True
+app.config['SQLITE_PRAGMAS'] = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 268435456,
+    'cache_size': -20000
+}
+app.config['SQLITE_POOL_SIZE'] = 10
+app.config['SQLITE_MAX_OVERFLOW'] = 20
+app.config['DB_BUSY_RETRIES'] = 5
+app.config['PASSWORD_HASH_METHOD'] = 'scrypt:32768:8:1'
+app.config['ARCHIVE_AFTER_DAYS'] = 180
+app.config['ARCHIVE_BATCH_SIZE'] = 1000
+app.config['BULK_BATCH_SIZE'] = 5000
+app.config['BULK_MAX_ERRORS'] = 100
+app.config['API_PAGE_SIZE'] = 50
+app.config['API_MAX_PAGE_SIZE'] = 200
+app.config['API_GZIP_MIN_BYTES'] = 1024
 db = SQLAlchemy()
-db.init_app(app)
+lot_cache = LocalCache()
+metrics = Metrics()
+spot_events = SpotEventBroker()
 
 class User(db.Model):
     __tablename__ = 'user'
@@ -31,16 +73,28 @@ class Admin(db.Model):
 
 class ParkingLot(db.Model):
     __tablename__ = 'parking_lot'
+    __table_args__ = (
+        db.Index('ix_parking_lot_pincode', 'pincode'),
+    )
     lot_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     prime_location_name = db.Column(db.String(50), nullable=False)
     price_per_hour = db.Column(db.Float, nullable=False)
     address = db.Column(db.String(100), nullable=False)
     pincode = db.Column(db.String(10), nullable=False)
     max_spots = db.Column(db.Integer, nullable=False)
+    occupied_count = db.Column(db.Integer, nullable=False, default=0)
+    available_count = db.Column(db.Integer, nullable=False, default=0)
+    active_reservation_count = db.Column(db.Integer, nullable=False, default=0)
+    revenue_total = db.Column(db.Float, nullable=False, default=0.0)
+    pricing_rules = db.Column(db.Text, nullable=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
     spots = db.relationship('ParkingSpot', backref='lot', lazy=True, cascade="all, delete")
 
 class ParkingSpot(db.Model):
     __tablename__ = 'parking_spot'
+    __table_args__ = (
+        db.Index('ix_parking_spot_lot_status', 'lot_id', 'status'),
+    )
     spot_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     lot_id = db.Column(db.Integer, db.ForeignKey('parking_lot.lot_id', ondelete='CASCADE'), nullable=False)
     status = db.Column(db.String(1), nullable=False, default='A')  
@@ -48,6 +102,11 @@ class ParkingSpot(db.Model):
 
 class Reservation(db.Model):
     __tablename__ = 'reservation'
+    __table_args__ = (
+        db.Index('ix_reservation_spot_leaving', 'spot_id', 'leaving_timestamp'),
+        db.Index('ix_reservation_user_parking', 'user_id', 'parking_timestamp'),
+        db.Index('ix_reservation_leaving_spot', 'leaving_timestamp', 'spot_id', 'parking_timestamp'),
+    )
     res_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     spot_id = db.Column(db.Integer, db.ForeignKey('parking_spot.spot_id', ondelete='CASCADE'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.u_id', ondelete='CASCADE'), nullable=False)
@@ -56,14 +115,329 @@ class Reservation(db.Model):
     total_cost = db.Column(db.Float, nullable=True)  
     vehicle_no = db.Column(db.String(20), nullable=False)
 
-@app.before_request
-def create_tables():
-    db.create_all()
+class LotRevenue(db.Model):
+    __tablename__ = 'lot_revenue'
+    lot_id = db.Column(db.Integer, db.ForeignKey('parking_lot.lot_id', ondelete='CASCADE'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+    reservation_count = db.Column(db.Integer, nullable=False, default=0)
+
+class ChangeCounter(db.Model):
+    __tablename__ = 'change_counter'
+    name = db.Column(db.String(20), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+class ArchivedReservation(db.Model):
+    __tablename__ = 'reservation_archive'
+    __table_args__ = (
+        db.Index('ix_reservation_archive_user_parking', 'user_id', 'parking_timestamp'),
+        db.Index('ix_reservation_archive_spot', 'spot_id'),
+        db.Index('ix_reservation_archive_month', 'archive_month'),
+    )
+    res_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    spot_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    parking_timestamp = db.Column(db.DateTime, nullable=False)
+    leaving_timestamp = db.Column(db.DateTime, nullable=False)
+    total_cost = db.Column(db.Float, nullable=True)
+    vehicle_no = db.Column(db.String(20), nullable=False)
+    archive_month = db.Column(db.String(7), nullable=False)
+
+class UserUsageRollup(db.Model):
+    __tablename__ = 'user_usage_rollup'
+    user_id = db.Column(db.Integer, primary_key=True)
+    lot_id = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.String(7), primary_key=True)
+    reservation_count = db.Column(db.Integer, nullable=False, default=0)
+    spent = db.Column(db.Float, nullable=False, default=0.0)
+
+# Migrations use raw SQL frozen at their schema version, never the live models or helpers,
+# so an old database can still step through them after later columns are added.
+MIGRATIONS = []
+
+def migration(fn):
+    MIGRATIONS.append(fn)
+    return fn
+
+def column_exists(table, column):
+    rows = db.session.execute(text(f"PRAGMA table_info({table})")).fetchall()
+    return any(r[1] == column for r in rows)
+
+@migration
+def add_hot_path_indexes():
+    db.session.execute(text("CREATE INDEX IF NOT EXISTS ix_parking_spot_lot_status ON parking_spot (lot_id, status)"))
+    db.session.execute(text("CREATE INDEX IF NOT EXISTS ix_reservation_spot_leaving ON reservation (spot_id, leaving_timestamp)"))
+    db.session.execute(text("CREATE INDEX IF NOT EXISTS ix_reservation_user_parking ON reservation (user_id, parking_timestamp)"))
+
+@migration
+def add_lot_counters():
+    for column in ('occupied_count', 'available_count', 'active_reservation_count'):
+        if not column_exists('parking_lot', column):
+            db.session.execute(text(f"ALTER TABLE parking_lot ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0"))
+    db.session.execute(text(
+        "UPDATE parking_lot SET "
+        "occupied_count = (SELECT COUNT(*) FROM parking_spot "
+        "                  WHERE parking_spot.lot_id = parking_lot.lot_id AND parking_spot.status = 'O'), "
+        "available_count = (SELECT COUNT(*) FROM parking_spot "
+        "                   WHERE parking_spot.lot_id = parking_lot.lot_id AND parking_spot.status != 'O'), "
+        "active_reservation_count = (SELECT COUNT(*) FROM reservation "
+        "                            JOIN parking_spot ON reservation.spot_id = parking_spot.spot_id "
+        "                            WHERE parking_spot.lot_id = parking_lot.lot_id AND reservation.leaving_timestamp IS NULL)"
+    ))
+
+@migration
+def add_pincode_index():
+    db.session.execute(text("CREATE INDEX IF NOT EXISTS ix_parking_lot_pincode ON parking_lot (pincode)"))
+
+@migration
+def backfill_revenue_ledger():
+    db.session.execute(text("DELETE FROM lot_revenue"))
+    db.session.execute(text(
+        "INSERT INTO lot_revenue (lot_id, day, revenue, reservation_count) "
+        "SELECT parking_spot.lot_id, date(reservation.leaving_timestamp, '+330 minutes'), "
+        "SUM(COALESCE(reservation.total_cost, 0)), COUNT(*) "
+        "FROM reservation JOIN parking_spot ON reservation.spot_id = parking_spot.spot_id "
+        "WHERE reservation.leaving_timestamp IS NOT NULL "
+        "GROUP BY parking_spot.lot_id, date(reservation.leaving_timestamp, '+330 minutes')"
+    ))
+
+@migration
+def add_lot_search_index():
+    db.session.execute(text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS lot_search USING fts5("
+        "prime_location_name, pincode, content='parking_lot', content_rowid='lot_id', tokenize='trigram')"
+    ))
+    db.session.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS lot_search_insert AFTER INSERT ON parking_lot BEGIN "
+        "INSERT INTO lot_search (rowid, prime_location_name, pincode) VALUES (new.lot_id, new.prime_location_name, new.pincode); "
+        "END"
+    ))
+    db.session.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS lot_search_delete AFTER DELETE ON parking_lot BEGIN "
+        "INSERT INTO lot_search (lot_search, rowid, prime_location_name, pincode) VALUES ('delete', old.lot_id, old.prime_location_name, old.pincode); "
+        "END"
+    ))
+    db.session.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS lot_search_update AFTER UPDATE OF prime_location_name, pincode ON parking_lot BEGIN "
+        "INSERT INTO lot_search (lot_search, rowid, prime_location_name, pincode) VALUES ('delete', old.lot_id, old.prime_location_name, old.pincode); "
+        "INSERT INTO lot_search (rowid, prime_location_name, pincode) VALUES (new.lot_id, new.prime_location_name, new.pincode); "
+        "END"
+    ))
+    db.session.execute(text("INSERT INTO lot_search (lot_search) VALUES ('rebuild')"))
+
+@migration
+def add_lot_pricing_rules():
+    if not column_exists('parking_lot', 'pricing_rules'):
+        db.session.execute(text("ALTER TABLE parking_lot ADD COLUMN pricing_rules TEXT"))
+
+@migration
+def add_lot_versions():
+    if not column_exists('parking_lot', 'version'):
+        db.session.execute(text("ALTER TABLE parking_lot ADD COLUMN version INTEGER NOT NULL DEFAULT 0"))
+
+@migration
+def add_open_reservation_index():
+    # Leading with leaving_timestamp lets "leaving_timestamp IS NULL" seek straight to the open reservations.
+    db.session.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_reservation_leaving_spot ON reservation (leaving_timestamp, spot_id, parking_timestamp)"
+    ))
+
+@migration
+def add_lot_revenue_totals():
+    # A running total per lot, so the admin summary never sums the whole daily ledger.
+    if not column_exists('parking_lot', 'revenue_total'):
+        db.session.execute(text("ALTER TABLE parking_lot ADD COLUMN revenue_total FLOAT NOT NULL DEFAULT 0"))
+    db.session.execute(text(
+        "UPDATE parking_lot SET revenue_total = "
+        "(SELECT COALESCE(SUM(revenue), 0) FROM lot_revenue WHERE lot_revenue.lot_id = parking_lot.lot_id)"
+    ))
+
+def schema_version():
+    return db.session.execute(text("PRAGMA user_version")).scalar()
+
+def migrate_db():
+    version = schema_version()
+    for number, step in enumerate(MIGRATIONS, start=1):
+        if number <= version:
+            continue
+        step()
+        db.session.execute(text(f"PRAGMA user_version = {number}"))
+        db.session.commit()
+    return schema_version()
+
+def seed_admin():
     if not Admin.query.filter_by(email="abc@gmail.com").first():
-        admin=Admin(email="abc@gmail.com",password=generate_password_hash("Shreya@123"),name="Admin")
+        admin=Admin(email="abc@gmail.com",password=hash_password("Shreya@123"),name="Admin")
         db.session.add(admin)
         db.session.commit()
 
+def next_lot_version():
+    # One counter for all lots, so a deleted lot can never hand its version to a new one.
+    return db.session.execute(text(
+        "INSERT INTO change_counter (name, value) VALUES ('lots', 1) "
+        "ON CONFLICT (name) DO UPDATE SET value = value + 1 RETURNING value"
+    )).scalar()
+
+def touch_lots(*lot_ids):
+    version = next_lot_version()
+    if lot_ids:
+        ParkingLot.query.filter(ParkingLot.lot_id.in_(lot_ids)) \
+            .update({ParkingLot.version: version}, synchronize_session=False)
+    return version
+
+def lots_version():
+    return db.session.query(ChangeCounter.value).filter_by(name='lots').scalar() or 0
+
+def adjust_lot_counters(lot_id, occupied=0, available=0, active=0, revenue=0.0):
+    ParkingLot.query.filter_by(lot_id=lot_id).update({
+        ParkingLot.version: next_lot_version(),
+        ParkingLot.occupied_count: ParkingLot.occupied_count + occupied,
+        ParkingLot.available_count: ParkingLot.available_count + available,
+        ParkingLot.active_reservation_count: ParkingLot.active_reservation_count + active,
+        ParkingLot.revenue_total: ParkingLot.revenue_total + revenue
+    })
+
+def rebuild_lot_counters(repair=True):
+    occupancy = lot_occupancy()
+    active = dict(db.session.query(ParkingSpot.lot_id, func.count(Reservation.res_id))
+                  .join(Reservation, Reservation.spot_id == ParkingSpot.spot_id)
+                  .filter(Reservation.leaving_timestamp.is_(None))
+                  .group_by(ParkingSpot.lot_id).all())
+    drifted = []
+    for lot in db.session.query(ParkingLot.lot_id, ParkingLot.occupied_count,
+                                ParkingLot.available_count, ParkingLot.active_reservation_count):
+        counts = occupancy.get(lot.lot_id, {'occupied': 0, 'available': 0})
+        expected = (counts['occupied'], counts['available'], active.get(lot.lot_id, 0))
+        if (lot.occupied_count, lot.available_count, lot.active_reservation_count) != expected:
+            drifted.append(lot.lot_id)
+            if repair:
+                ParkingLot.query.filter_by(lot_id=lot.lot_id).update(dict(zip(
+                    (ParkingLot.occupied_count, ParkingLot.available_count, ParkingLot.active_reservation_count), expected
+                )), synchronize_session=False)
+    if repair:
+        db.session.commit()
+        lot_cache.clear()
+    return drifted
+
+def hot_paths(lot_id=1, user_id=1, email='user@example.com'):
+    # The lookups the request handlers run, called through the same functions so plan checks follow the real SQL.
+    return {
+        'claim spot': lambda: claim_spot(lot_id),
+        'active reservation for spot': lambda: active_reservation(1),
+        'parking history': lambda: get_parking_history(user_id),
+        'user usage summary': lambda: user_usage(user_id),
+        'open reservation estimates': lambda: open_reservation_estimates(datetime.utcnow()),
+        'login lookup': lambda: find_identities(email),
+        'lot search': lambda: search_lots('Lot', 'location'),
+        'pincode prefix search': lambda: search_lots('60', 'pincode'),
+        'lot by id': lambda: get_lots([lot_id]),
+    }
+
+def capture_statements(fn):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return statements
+
+def statement_scans(statement, parameters):
+    if not statement.lstrip().upper().startswith(('SELECT', 'WITH', 'UPDATE', 'DELETE')):
+        return []
+    plan = db.session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    return [row[-1] for row in plan if row[-1].startswith('SCAN ') and 'VIRTUAL TABLE' not in row[-1]]
+
+def query_plan_scans(paths=None):
+    scans = {}
+    for name, fn in (paths or hot_paths()).items():
+        lot_cache.clear()
+        statements = capture_statements(fn)
+        found = [scan for statement, parameters in statements for scan in statement_scans(statement, parameters)]
+        db.session.rollback()
+        if found:
+            scans[name] = found
+    return scans
+
+def init_db():
+    db.create_all()
+    version = migrate_db()
+    seed_admin()
+    return version
+
+@app.cli.command('migrate')
+def migrate_command():
+    version = init_db()
+    click.echo(f"Database schema at version {version}")
+
+@app.cli.command('check-query-plans')
+def check_query_plans_command():
+    scans = query_plan_scans()
+    for name, details in scans.items():
+        click.echo(f"{name}: {'; '.join(details)}")
+    if scans:
+        raise click.ClickException(f"{len(scans)} hot queries fall back to a full table scan")
+    click.echo(f"All {len(hot_paths())} hot queries use an index")
+
+@app.cli.command('backfill-revenue')
+def backfill_revenue_command():
+    backfill_revenue()
+    click.echo(f"Rebuilt {LotRevenue.query.count()} daily revenue rows")
+
+@app.cli.command('check-counters')
+@click.option('--repair', is_flag=True, help='Rewrite drifted lot counters from the spot and reservation rows.')
+def check_counters_command(repair):
+    drifted = rebuild_lot_counters(repair=repair)
+    if drifted and repair:
+        touch_lots(*drifted)
+        db.session.commit()
+    if not drifted:
+        click.echo("All lot counters are consistent")
+    elif repair:
+        click.echo(f"Repaired counters for lots: {', '.join(map(str, drifted))}")
+    else:
+        click.echo(f"Counter drift in lots: {', '.join(map(str, drifted))}")
+
+def configure_sqlite(app):
+    if not app.config['SQLITE_TUNING']:
+        return
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    if uri in ('sqlite://', 'sqlite:///:memory:'):
+        return
+    options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    options.setdefault('pool_size', app.config['SQLITE_POOL_SIZE'])
+    options.setdefault('max_overflow', app.config['SQLITE_MAX_OVERFLOW'])
+    options.setdefault('connect_args', {}).setdefault('check_same_thread', False)
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in app.config['SQLITE_PRAGMAS'].items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+    cursor.close()
+
+def is_busy_error(error):
+    message = str(error.orig).lower()
+    return 'database is locked' in message or 'database table is locked' in message or 'busy' in message
+
+def retry_on_busy(fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        retries = app.config['DB_BUSY_RETRIES']
+        for attempt in range(retries + 1):
+            try:
+                return fn(*args, **kwargs)
+            except OperationalError as e:
+                db.session.rollback()
+                if attempt == retries or not is_busy_error(e):
+                    raise
+                time.sleep(0.01 * 2 ** attempt)
+    return wrapper
+
 @app.route('/clear_flash_messages', methods=['POST'])
 def clear_flash_messages():
     session.pop('_flashes', None) 
@@ -73,6 +447,13 @@ def clear_flash_messages():
 def start():
     return render_template('login.html')
 
+@retry_on_busy
+def create_user(**fields):
+    user = User(**fields)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
 @app.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method=='POST':
@@ -89,11 +470,9 @@ def register():
                 flash("User already registered!","warning")
                 return redirect(url_for('register'))
             else:
-                p=generate_password_hash(password)
-                new=User(email=email, password=p,name=name, address=address, pincode=pincode)
+                p=hash_password(password)
                 try:
-                    db.session.add(new)
-                    db.session.commit()
+                    create_user(email=email, password=p, name=name, address=address, pincode=pincode)
                     flash("Registered successfully!","success!!")
                     return redirect(url_for('login'))
                 except Exception as x:
@@ -101,6 +480,49 @@ def register():
                     flash(f"{str(x)}")
     return render_template('register.html')
 
+CurrentUser = namedtuple('CurrentUser', 'u_id name')
+UserProfile = namedtuple('UserProfile', 'u_id email name address pincode')
+
+@lru_cache(maxsize=None)
+def hash_prefix(method):
+    return generate_password_hash('', method=method).split('$', 1)[0]
+
+def hash_password(password):
+    return generate_password_hash(password, method=app.config['PASSWORD_HASH_METHOD'])
+
+def needs_rehash(password_hash):
+    return password_hash.split('$', 1)[0] != hash_prefix(app.config['PASSWORD_HASH_METHOD'])
+
+def find_identities(email):
+    return db.session.execute(text(
+        "SELECT 'admin' AS role, 0 AS rank, id, password, name, email, NULL AS address, NULL AS pincode FROM admin WHERE email = :email "
+        "UNION ALL "
+        "SELECT 'user' AS role, 1 AS rank, u_id, password, name, email, address, pincode FROM user WHERE email = :email "
+        "ORDER BY rank"
+    ), {'email': email}).all()
+
+def rehash_identity(identity, password):
+    model, key = (Admin, Admin.id) if identity.role == 'admin' else (User, User.u_id)
+    model.query.filter(key == identity.id).update({model.password: hash_password(password)}, synchronize_session=False)
+    db.session.commit()
+
+def cache_current_user(user):
+    # The session cookie is signed, not encrypted, so only the id and name go in it; the rest of the profile is cached server-side.
+    session['current_user'] = CurrentUser(user.u_id, user.name)._asdict()
+    cache_user_profile(user)
+
+def cache_user_profile(user):
+    profile = UserProfile(user.u_id, user.email, user.name, user.address, user.pincode)
+    lot_cache.set(f"user:{user.u_id}", profile._asdict())
+    return profile
+
+def get_user_profile(u_id):
+    cached = lot_cache.get(f"user:{u_id}")
+    if cached:
+        return UserProfile(**cached)
+    user = db.session.get(User, u_id)
+    return cache_user_profile(user) if user else None
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
@@ -109,17 +531,20 @@ def login():
         if not email or not password:
             flash("All fields are required!", "danger")
         else:
-            admin = Admin.query.filter_by(email=email).first()
-            if admin and check_password_hash(admin.password, password):
-                session['admin_id'] = admin.id
-                session['name'] = admin.name
-                session['user_role'] = 'admin'
-                flash("Admin login successful", "success")
-                return redirect(url_for('admin_dashboard'))
-            user = User.query.filter_by(email=email).first()
-            if user and check_password_hash(user.password, password):
-                session['u_id'] = user.u_id
-                session['name'] = user.name
+            for identity in find_identities(email):
+                if not check_password_hash(identity.password, password):
+                    continue
+                if needs_rehash(identity.password):
+                    rehash_identity(identity, password)
+                if identity.role == 'admin':
+                    session['admin_id'] = identity.id
+                    session['name'] = identity.name
+                    session['user_role'] = 'admin'
+                    flash("Admin login successful", "success")
+                    return redirect(url_for('admin_dashboard'))
+                cache_current_user(UserProfile(identity.id, identity.email, identity.name, identity.address, identity.pincode))
+                session['u_id'] = identity.id
+                session['name'] = identity.name
                 flash("User login successful", "success")
                 return redirect(url_for('user_dashboard'))
             flash("Invalid login credentials!", "warning")
@@ -134,26 +559,379 @@ def logout():
     session.clear()
     return render_template('logout.html', admin_or_not=admin_or_not)
 
+def lot_occupancy():
+    rows = db.session.query(
+        ParkingSpot.lot_id,
+        func.count(ParkingSpot.spot_id),
+        func.sum(case((ParkingSpot.status == 'O', 1), else_=0))
+    ).group_by(ParkingSpot.lot_id).all()
+    occupancy = {}
+    for lot_id, total, occupied in rows:
+        occupied = occupied or 0
+        occupancy[lot_id] = {'total': total, 'occupied': occupied, 'available': total - occupied}
+    return occupancy
+
+def record_revenue(lot_id, left_at, cost):
+    day = left_at.replace(tzinfo=ZoneInfo("UTC")).astimezone(ZoneInfo("Asia/Kolkata")).date()
+    stmt = sqlite_insert(LotRevenue).values(lot_id=lot_id, day=day, revenue=cost, reservation_count=1)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[LotRevenue.lot_id, LotRevenue.day],
+        set_={
+            'revenue': LotRevenue.revenue + stmt.excluded.revenue,
+            'reservation_count': LotRevenue.reservation_count + 1
+        }
+    ))
+
+def backfill_revenue():
+    LotRevenue.query.delete()
+    db.session.execute(text(
+        "INSERT INTO lot_revenue (lot_id, day, revenue, reservation_count) "
+        "SELECT parking_spot.lot_id, date(reservation.leaving_timestamp, '+330 minutes'), "
+        "SUM(COALESCE(reservation.total_cost, 0)), COUNT(*) "
+        "FROM (SELECT spot_id, leaving_timestamp, total_cost FROM reservation "
+        "      UNION ALL SELECT spot_id, leaving_timestamp, total_cost FROM reservation_archive) AS reservation "
+        "JOIN parking_spot ON reservation.spot_id = parking_spot.spot_id "
+        "WHERE reservation.leaving_timestamp IS NOT NULL "
+        "GROUP BY parking_spot.lot_id, date(reservation.leaving_timestamp, '+330 minutes')"
+    ))
+    ParkingLot.query.update({ParkingLot.revenue_total: func.coalesce(
+        db.session.query(func.sum(LotRevenue.revenue)).filter(LotRevenue.lot_id == ParkingLot.lot_id).scalar_subquery(), 0
+    )}, synchronize_session=False)
+    db.session.commit()
+    lot_cache.clear()
+
+def archive_reservations(older_than_days=None, batch_size=None, max_batches=None, pause=0):
+    if older_than_days is None:
+        older_than_days = app.config['ARCHIVE_AFTER_DAYS']
+    if batch_size is None:
+        batch_size = app.config['ARCHIVE_BATCH_SIZE']
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    moved = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        res_ids = [row.res_id for row in db.session.query(Reservation.res_id)
+                   .filter(Reservation.leaving_timestamp.isnot(None), Reservation.leaving_timestamp < cutoff)
+                   .order_by(Reservation.res_id).limit(batch_size)]
+        if not res_ids:
+            break
+        archive_batch(res_ids)
+        moved += len(res_ids)
+        batches += 1
+        if pause:
+            time.sleep(pause)
+    return moved
+
+@retry_on_busy
+def archive_batch(res_ids):
+    params = {'ids': res_ids}
+    in_batch = "reservation.res_id IN :ids"
+    month = "strftime('%Y-%m', reservation.parking_timestamp, '+330 minutes')"
+    db.session.execute(text(
+        "INSERT INTO reservation_archive (res_id, spot_id, user_id, parking_timestamp, leaving_timestamp, total_cost, vehicle_no, archive_month) "
+        f"SELECT res_id, spot_id, user_id, parking_timestamp, leaving_timestamp, total_cost, vehicle_no, {month} "
+        f"FROM reservation WHERE {in_batch}"
+    ).bindparams(db.bindparam('ids', expanding=True)), params)
+    db.session.execute(text(
+        "INSERT INTO user_usage_rollup (user_id, lot_id, month, reservation_count, spent) "
+        f"SELECT reservation.user_id, COALESCE(parking_spot.lot_id, 0), {month}, COUNT(*), COALESCE(SUM(reservation.total_cost), 0) "
+        "FROM reservation LEFT JOIN parking_spot ON reservation.spot_id = parking_spot.spot_id "
+        f"WHERE {in_batch} GROUP BY 1, 2, 3 "
+        "ON CONFLICT (user_id, lot_id, month) DO UPDATE SET "
+        "reservation_count = reservation_count + excluded.reservation_count, spent = spent + excluded.spent"
+    ).bindparams(db.bindparam('ids', expanding=True)), params)
+    db.session.execute(text(f"DELETE FROM reservation WHERE {in_batch}")
+                       .bindparams(db.bindparam('ids', expanding=True)), params)
+    db.session.commit()
+
+@app.cli.command('archive-reservations')
+@click.option('--days', type=int, default=None, help='Archive reservations closed more than this many days ago.')
+@click.option('--batch-size', type=int, default=None)
+@click.option('--max-batches', type=int, default=None, help='Stop after this many batches; rerun to resume.')
+@click.option('--pause', type=float, default=0, help='Seconds to sleep between batches.')
+def archive_reservations_command(days, batch_size, max_batches, pause):
+    moved = archive_reservations(days, batch_size, max_batches, pause)
+    click.echo(f"Archived {moved} reservations")
+
+@retry_on_busy
+def import_lot_batch(records):
+    lots = [ParkingLot(occupied_count=0, available_count=record['max_spots'], active_reservation_count=0, **record)
+            for _, record in records]
+    db.session.add_all(lots)
+    db.session.flush()
+    for lot in lots:
+        provision_spots(lot.lot_id, lot.max_spots)
+    touch_lots(*[lot.lot_id for lot in lots])
+    db.session.commit()
+    return []
+
+@retry_on_busy
+def import_user_batch(records):
+    emails = [record['email'] for _, record in records]
+    taken = {row.email for row in db.session.query(User.email).filter(User.email.in_(emails))}
+    taken.update(row.email for row in db.session.query(Admin.email).filter(Admin.email.in_(emails)))
+    errors = []
+    rows = []
+    for line, record in records:
+        if record['email'] in taken:
+            errors.append((line, f"{record['email']} is already registered"))
+            continue
+        taken.add(record['email'])
+        rows.append({'email': record['email'], 'password': record['password_hash'] or hash_password(record['password']),
+                     'name': record['name'], 'address': record['address'], 'pincode': record['pincode']})
+    if rows:
+        db.session.execute(User.__table__.insert(), rows)
+    db.session.commit()
+    return errors
+
+@retry_on_busy
+def import_reservation_batch(records):
+    emails = {record['user_email'] for _, record in records if record['user_email']}
+    user_ids = {record['user_id'] for _, record in records if record['user_id'] is not None}
+    by_email = {row.email: row.u_id for row in db.session.query(User.email, User.u_id).filter(User.email.in_(emails))}
+    known_users = {row.u_id for row in db.session.query(User.u_id).filter(User.u_id.in_(user_ids))}
+    spots = {row.spot_id: row for row in db.session.query(
+        ParkingSpot.spot_id, ParkingSpot.lot_id, ParkingLot.price_per_hour, ParkingLot.pricing_rules
+    ).join(ParkingLot, ParkingSpot.lot_id == ParkingLot.lot_id)
+     .filter(ParkingSpot.spot_id.in_({record['spot_id'] for _, record in records}))}
+    errors = []
+    rows = []
+    unpriced = {}
+    for line, record in records:
+        user_id = record['user_id'] if record['user_id'] in known_users else by_email.get(record['user_email'])
+        if user_id is None:
+            errors.append((line, f"unknown user {record['user_id'] or record['user_email']}"))
+            continue
+        spot = spots.get(record['spot_id'])
+        if spot is None:
+            errors.append((line, f"unknown spot {record['spot_id']}"))
+            continue
+        row = {'spot_id': spot.spot_id, 'lot_id': spot.lot_id, 'user_id': user_id, 'vehicle_no': record['vehicle_no'],
+               'parking_timestamp': record['parking_timestamp'], 'leaving_timestamp': record['leaving_timestamp'],
+               'total_cost': record['total_cost']}
+        if row['total_cost'] is None:
+            unpriced.setdefault(spot.lot_id, []).append(row)
+        rows.append(row)
+    for lot_rows in unpriced.values():
+        spot = spots[lot_rows[0]['spot_id']]
+        costs = billing.batch_costs([billing.to_epoch(row['parking_timestamp']) for row in lot_rows],
+                                    [billing.to_epoch(row['leaving_timestamp']) for row in lot_rows],
+                                    spot.price_per_hour, json.loads(spot.pricing_rules) if spot.pricing_rules else None)
+        for row, cost in zip(lot_rows, costs):
+            row['total_cost'] = cost
+    if rows:
+        db.session.execute(Reservation.__table__.insert(), rows)
+        ledger = {}
+        for row in rows:
+            day = (row['leaving_timestamp'] + timedelta(minutes=330)).date()
+            entry = ledger.setdefault((row['lot_id'], day), {'lot_id': row['lot_id'], 'day': day,
+                                                            'revenue': 0.0, 'reservation_count': 0})
+            entry['revenue'] += row['total_cost']
+            entry['reservation_count'] += 1
+        stmt = sqlite_insert(LotRevenue)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=[LotRevenue.lot_id, LotRevenue.day],
+            set_={
+                'revenue': LotRevenue.revenue + stmt.excluded.revenue,
+                'reservation_count': LotRevenue.reservation_count + stmt.excluded.reservation_count
+            }
+        ), list(ledger.values()))
+        totals = {}
+        for entry in ledger.values():
+            totals[entry['lot_id']] = totals.get(entry['lot_id'], 0.0) + entry['revenue']
+        for lot_id, revenue in totals.items():
+            adjust_lot_counters(lot_id, revenue=revenue)
+    db.session.commit()
+    return errors
+
+BULK_IMPORTERS = {
+    'lots': (bulk.clean_lot, import_lot_batch),
+    'users': (bulk.clean_user, import_user_batch),
+    'reservations': (bulk.clean_reservation, import_reservation_batch)
+}
+
+def bulk_import(kind, stream, fmt, batch_size=None, on_error=None):
+    clean, load = BULK_IMPORTERS[kind]
+    result = {'imported': 0, 'failed': 0, 'errors': []}
+
+    def fail(line, error):
+        result['failed'] += 1
+        if len(result['errors']) < app.config['BULK_MAX_ERRORS']:
+            result['errors'].append({'line': line, 'error': str(error)})
+        if on_error:
+            on_error(line, error)
+
+    def valid_records():
+        for line, record in bulk.read_records(stream, fmt):
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                yield line, clean(record)
+            except ValueError as e:
+                fail(line, e)
+
+    for batch in bulk.batched(valid_records(), batch_size or app.config['BULK_BATCH_SIZE']):
+        errors = load(batch)
+        for line, error in errors:
+            fail(line, error)
+        result['imported'] += len(batch) - len(errors)
+    if kind == 'lots' and result['imported']:
+        lot_cache.clear()
+        spot_events.publish('lot', lot_id=None)
+    return result
+
+def bulk_export(kind):
+    if kind == 'lots':
+        query = db.session.query(*[getattr(ParkingLot, field) for field in bulk.LOT_FIELDS]).order_by(ParkingLot.lot_id)
+        return bulk.LOT_FIELDS, (row._mapping for row in query.yield_per(1000))
+    if kind == 'users':
+        query = db.session.query(*[getattr(User, field) for field in bulk.USER_FIELDS]).order_by(User.u_id)
+        return bulk.USER_FIELDS, (row._mapping for row in query.yield_per(1000))
+    queries = [db.session.query(ParkingSpot.lot_id, *[getattr(model, field) for field in bulk.RESERVATION_FIELDS if field != 'lot_id'])
+               .outerjoin(ParkingSpot, model.spot_id == ParkingSpot.spot_id).order_by(model.res_id)
+               for model in (ArchivedReservation, Reservation)]
+    return bulk.RESERVATION_FIELDS, (row._mapping for query in queries for row in query.yield_per(1000))
+
+def bulk_format(fmt, filename):
+    return fmt or ('jsonl' if filename.endswith(('.jsonl', '.json', '.ndjson')) else 'csv')
+
+@app.cli.command('import')
+@click.argument('kind', type=click.Choice(sorted(BULK_IMPORTERS)))
+@click.argument('source', type=click.File('rb'))
+@click.option('--format', 'fmt', type=click.Choice(bulk.FORMATS), default=None, help='Defaults to the file extension.')
+@click.option('--batch-size', type=int, default=None)
+def import_command(kind, source, fmt, batch_size):
+    result = bulk_import(kind, source, bulk_format(fmt, source.name), batch_size,
+                         on_error=lambda line, error: click.echo(f"line {line}: {error}", err=True))
+    click.echo(f"Imported {result['imported']} {kind}, {result['failed']} rows failed")
+
+@app.cli.command('export')
+@click.argument('kind', type=click.Choice(sorted(BULK_IMPORTERS)))
+@click.argument('target', type=click.File('w'), default='-')
+@click.option('--format', 'fmt', type=click.Choice(bulk.FORMATS), default=None, help='Defaults to the file extension.')
+def export_command(kind, target, fmt):
+    fields, rows = bulk_export(kind)
+    for chunk in bulk.write_records(rows, fields, bulk_format(fmt, target.name)):
+        target.write(chunk)
+
+def lot_revenue(lots, now=None):
+    if now is None:
+        now = datetime.utcnow()
+    revenue = {lot['lot_id']: lot['revenue_total'] for lot in lots}
+    for lot_id, estimate in open_reservation_estimates(now).items():
+        revenue[lot_id] = revenue.get(lot_id, 0.0) + estimate
+    return revenue
+
+def open_reservation_estimates(now):
+    parked_epoch = (func.julianday(Reservation.parking_timestamp) - 2440587.5) * 86400
+    parked_by_lot = {}
+    for lot_id, parked in db.session.query(ParkingSpot.lot_id, parked_epoch) \
+            .join(Reservation, Reservation.spot_id == ParkingSpot.spot_id) \
+            .filter(Reservation.leaving_timestamp.is_(None)):
+        parked_by_lot.setdefault(lot_id, []).append(parked)
+    estimates = {}
+    now_epoch = billing.to_epoch(now)
+    for lot in get_lots(list(parked_by_lot)):
+        parked = parked_by_lot[lot['lot_id']]
+        costs = billing.batch_costs(parked, [now_epoch] * len(parked), lot['price_per_hour'], lot['pricing_rules'])
+        estimates[lot['lot_id']] = sum(costs)
+    return estimates
+
+def lot_snapshot(lot):
+    return {
+        'lot_id': lot.lot_id,
+        'prime_location_name': lot.prime_location_name,
+        'price_per_hour': lot.price_per_hour,
+        'address': lot.address,
+        'pincode': lot.pincode,
+        'max_spots': lot.max_spots,
+        'occupied_count': lot.occupied_count,
+        'available_count': lot.available_count,
+        'active_reservation_count': lot.active_reservation_count,
+        'revenue_total': lot.revenue_total,
+        'pricing_rules': json.loads(lot.pricing_rules) if lot.pricing_rules else None,
+        'version': lot.version
+    }
+
+def get_lots(lot_ids):
+    lots = {}
+    missing = []
+    for lot_id in lot_ids:
+        snapshot = lot_cache.get(f"lot:{lot_id}")
+        if snapshot is None:
+            missing.append(lot_id)
+        else:
+            lots[lot_id] = snapshot
+    if missing:
+        for lot in ParkingLot.query.filter(ParkingLot.lot_id.in_(missing)):
+            lots[lot.lot_id] = lot_cache.set(f"lot:{lot.lot_id}", lot_snapshot(lot))
+    return [lots[lot_id] for lot_id in lot_ids if lot_id in lots]
+
+def get_lot(lot_id):
+    lots = get_lots([lot_id])
+    return lots[0] if lots else None
+
+def get_all_lots():
+    return lot_cache.get_or_set('lots', lambda: [lot_snapshot(lot) for lot in ParkingLot.query.order_by(ParkingLot.lot_id)])
+
+def invalidate_lot(lot_id):
+    lot_cache.delete(f"lot:{lot_id}", 'lots')
+
+def spots_by_lot(lot_ids=None):
+    query = db.session.query(ParkingSpot.spot_id, ParkingSpot.lot_id, ParkingSpot.status)
+    if lot_ids is not None:
+        query = query.filter(ParkingSpot.lot_id.in_(lot_ids))
+    spots = {}
+    for spot in query.order_by(ParkingSpot.lot_id, ParkingSpot.spot_id):
+        spots.setdefault(spot.lot_id, []).append(spot)
+    return spots
+
 @app.route('/admin_dashboard', methods=['GET', 'POST'])
 def admin_dashboard():
-    lots = ParkingLot.query.all()
+    # Taken before reading so any change committed while the page loads is replayed by the event stream.
+    since = spot_events.last_id
+    lots = get_all_lots()
+    spots = spots_by_lot()
     parking_lots = []
     for lot in lots:
-        spots = ParkingSpot.query.filter_by(lot_id=lot.lot_id).all()
-        total = len(spots)  
-        occupied = 0
-        for s in spots:
-            if s.status=='O':
-                occupied=occupied+1
-
         parking_lots.append({
-            'id': lot.lot_id,
-            'name': lot.prime_location_name,
-            'occupied': occupied,
-            'total': total,
-            'spots': spots  
+            'id': lot['lot_id'],
+            'name': lot['prime_location_name'],
+            'occupied': lot['occupied_count'],
+            'total': lot['occupied_count'] + lot['available_count'],
+            'spots': spots.get(lot['lot_id'], [])
         })
-    return render_template('admin_dashboard.html', parking_lots=parking_lots)
+    return render_template('admin_dashboard.html', parking_lots=parking_lots, events_since=since)
+
+@app.route('/admin/spot_events')
+def admin_spot_events():
+    if session.get('user_role') != 'admin':
+        abort(403)
+    after = request.headers.get('Last-Event-ID', type=int)
+    if after is None:
+        after = request.args.get('since', spot_events.last_id, type=int)
+    return Response(spot_events.stream(after), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def provision_spots(lot_id, count):
+    if count <= 0:
+        return 0
+    db.session.execute(text(
+        "INSERT INTO parking_spot (lot_id, status) "
+        "WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < :count) "
+        "SELECT :lot_id, 'A' FROM seq"
+    ), {'lot_id': lot_id, 'count': count})
+    return count
+
+def remove_spots(lot_id, count):
+    if count <= 0:
+        return 0
+    removable = db.session.query(ParkingSpot.spot_id) \
+        .filter(ParkingSpot.lot_id == lot_id, ParkingSpot.status == 'A') \
+        .order_by(ParkingSpot.spot_id.desc()).limit(count)
+    result = db.session.execute(
+        ParkingSpot.__table__.delete().where(ParkingSpot.spot_id.in_(removable.scalar_subquery()))
+    )
+    return result.rowcount
 
 @app.route('/add_parking_lot', methods=['GET', 'POST'])
 def add_parking_lot():
@@ -168,17 +946,18 @@ def add_parking_lot():
             address=address,
             pincode=pincode,
             price_per_hour=float(price),
-            max_spots=max_spots
+            max_spots=max_spots,
+            occupied_count=0,
+            available_count=max_spots,
+            active_reservation_count=0
         )
         db.session.add(new_lot)
+        db.session.flush()
+        provision_spots(new_lot.lot_id, max_spots)
+        touch_lots(new_lot.lot_id)
         db.session.commit()
-        for i in range(1, max_spots + 1):
-            new_spot = ParkingSpot(
-                lot_id=new_lot.lot_id,
-                status='A'
-            )
-            db.session.add(new_spot)
-        db.session.commit()
+        invalidate_lot(new_lot.lot_id)
+        spot_events.publish('lot', lot_id=new_lot.lot_id)
         flash('Parking lot added successfully with spots', 'success')
         return redirect(url_for('admin_dashboard'))
     return render_template('add_parking_lot.html')
@@ -192,27 +971,30 @@ def edit_parking_lot(lot_id):
         lot.address = request.form['address']
         lot.pincode = request.form['pincode']
         lot.price_per_hour = float(request.form['price_per_hour'])
-        current_spots = ParkingSpot.query.filter_by(lot_id=lot_id).all()
-        current_count = len(current_spots)
-
+        pricing_rules = request.form.get('pricing_rules', '').strip()
+        if pricing_rules:
+            try:
+                billing.validate_rules(json.loads(pricing_rules))
+            except ValueError as e:
+                flash(f'Invalid pricing rules: {e}', 'danger')
+                return render_template('edit_parking_lot.html', lot=lot)
+        lot.pricing_rules = pricing_rules or None
+        current_count = ParkingSpot.query.filter_by(lot_id=lot_id).count()
         if new_max_spots > current_count:
-            for i in range(current_count + 1, new_max_spots + 1):
-                new_spot = ParkingSpot(
-                    lot_id=lot.lot_id,
-                    status='A'
-                )
-                db.session.add(new_spot)
+            adjust_lot_counters(lot_id, available=provision_spots(lot_id, new_max_spots - current_count))
         elif new_max_spots < current_count:
-            removable_spots = ParkingSpot.query.filter_by(lot_id=lot_id, status='A').order_by(ParkingSpot.spot_id.desc()).all()
-            to_remove = current_count - new_max_spots
-            count = 0
-            for spot in removable_spots:
-                if count >= to_remove:
-                    break
-                db.session.delete(spot)
-                count += 1
+            removed = remove_spots(lot_id, current_count - new_max_spots)
+            adjust_lot_counters(lot_id, available=-removed)
+            kept = current_count - removed - new_max_spots
+            if kept:
+                # Occupied spots stay until they are released, so the lot keeps them in its size.
+                flash(f'{kept} occupied spots could not be removed', 'warning')
+                new_max_spots += kept
         lot.max_spots = new_max_spots
+        touch_lots(lot_id)
         db.session.commit()
+        invalidate_lot(lot_id)
+        spot_events.publish('lot', lot_id=lot_id)
         flash('Parking lot updated successfully', 'success')
         return redirect(url_for('admin_dashboard'))
     return render_template('edit_parking_lot.html', lot=lot)
@@ -227,7 +1009,10 @@ def delete_parking_lot(lot_id):
     try:
         ParkingSpot.query.filter_by(lot_id=lot.lot_id).delete()
         db.session.delete(lot)
+        touch_lots()
         db.session.commit()
+        invalidate_lot(lot_id)
+        spot_events.publish('lot', lot_id=lot_id)
         flash('Parking Lot deleted successfully.', 'success')
     except Exception as e:
         db.session.rollback()
@@ -238,105 +1023,145 @@ def delete_parking_lot(lot_id):
 def view_delete_parking_spot(spot_id):
     spot = ParkingSpot.query.get_or_404(spot_id)
     if request.method == 'POST':
-        if spot.status == 'A':  
-            db.session.delete(spot)
-            lot=ParkingLot.query.get(spot.lot_id)
-            if lot.max_spots>0:
-                lot.max_spots-=1
+        lot_id = spot.lot_id
+        deleted = ParkingSpot.query.filter_by(spot_id=spot_id, status='A').delete(synchronize_session=False)
+        if deleted:
+            ParkingLot.query.filter(ParkingLot.lot_id == lot_id, ParkingLot.max_spots > 0) \
+                .update({ParkingLot.max_spots: ParkingLot.max_spots - 1}, synchronize_session=False)
+            adjust_lot_counters(lot_id, available=-1)
             db.session.commit()
+            invalidate_lot(lot_id)
+            spot_events.publish('spot', lot_id=lot_id, spot_id=spot_id, status='D')
             flash('Spot deleted successfully', 'success')
         else:
+            db.session.rollback()
             flash('Cannot delete an occupied spot!', 'danger')
         return redirect(url_for('admin_dashboard'))
     return render_template('view_delete_parking_spot.html', spot=spot)
 
+def active_reservation(spot_id):
+    return Reservation.query.filter_by(spot_id=spot_id, leaving_timestamp=None).first()
+
 @app.route('/occupied_parking_spot_details/<int:spot_id>')
 def occupied_parking_spot_details(spot_id):
     spot = ParkingSpot.query.get_or_404(spot_id)
     if spot.status != 'O':
         flash('This spot is not currently occupied.', 'info')
         return redirect(url_for('admin_dashboard'))
-    reservation = Reservation.query.filter_by(spot_id=spot.spot_id, leaving_timestamp=None).first()
+    reservation = active_reservation(spot.spot_id)
     if not reservation:
         flash('No active reservation found for this spot.', 'info')
         return redirect(url_for('admin_dashboard'))
-    lot = ParkingLot.query.get(spot.lot_id)
-    ist = timezone('Asia/Kolkata')
-    utc_time = reservation.parking_timestamp
-    if utc_time.tzinfo is None:
-        utc_time = pytz.utc.localize(utc_time)
-    ist_time = utc_time.astimezone(ist)
-    now_ist = datetime.utcnow().replace(tzinfo=pytz.utc).astimezone(ist)
-    duration = (now_ist - ist_time).total_seconds() / 3600  
-    cost = round(duration * lot.price_per_hour, 2)
+    lot = get_lot(spot.lot_id)
+    cost = billing.reservation_cost(reservation.parking_timestamp, datetime.utcnow(), lot['price_per_hour'], lot['pricing_rules'])
 
     data = {
         'spot_id': spot.spot_id,
         'customer_id': reservation.user_id,
         'vehicle_no': reservation.vehicle_no,
-        'timestamp': ist_time.strftime('%Y-%m-%d %H:%M'),
+        'timestamp': to_ist(reservation.parking_timestamp),
         'cost': cost
     }
     return render_template('occupied_parking_spot.html', spot=data)
 
+@app.route('/admin/metrics')
+def admin_metrics():
+    if session.get('user_role') != 'admin':
+        abort(403)
+    cache_stats = {f'lot_cache_{name}_total': value for name, value in lot_cache.stats.as_dict().items()}
+    return Response(metrics.render(extra=cache_stats), mimetype='text/plain; version=0.0.4')
+
+@app.route('/admin/import/<kind>', methods=['POST'])
+def admin_import(kind):
+    if session.get('user_role') != 'admin':
+        abort(403)
+    if kind not in BULK_IMPORTERS:
+        abort(404)
+    upload = request.files.get('file')
+    fmt = bulk_format(request.args.get('format'), upload.filename if upload else '')
+    if fmt not in bulk.FORMATS:
+        abort(400)
+    return jsonify(bulk_import(kind, upload.stream if upload else request.stream, fmt))
+
+@app.route('/admin/export/<kind>')
+def admin_export(kind):
+    if session.get('user_role') != 'admin':
+        abort(403)
+    if kind not in BULK_IMPORTERS:
+        abort(404)
+    fmt = request.args.get('format', 'csv')
+    if fmt not in bulk.FORMATS:
+        abort(400)
+    fields, rows = bulk_export(kind)
+    return Response(stream_with_context(bulk.write_records(rows, fields, fmt)),
+                    mimetype='text/csv' if fmt == 'csv' else 'application/x-ndjson',
+                    headers={'Content-Disposition': f'attachment; filename={kind}.{fmt}'})
+
 @app.route('/admin/users')
 def view_users():
     users = User.query.all()
     return render_template('view_users.html', users=users)
 
+SEARCH_COLUMNS = {'location': ParkingLot.prime_location_name, 'pincode': ParkingLot.pincode}
+
+def search_lots(search_query, filter_by='location', page=1, per_page=None):
+    if per_page is None:
+        per_page = app.config['SEARCH_PAGE_SIZE']
+    column = SEARCH_COLUMNS[filter_by]
+    offset = (max(page, 1) - 1) * per_page
+    search_query = (search_query or '').strip()
+    if not search_query:
+        lots = get_all_lots()[offset:offset + per_page + 1]
+    elif len(search_query) < 3:
+        # The trigram index needs three characters, so short queries fall back to a prefix match.
+        # Pincodes are digits, so a range matches the same rows and can seek ix_parking_lot_pincode.
+        prefix = column.ilike(f"{search_query}%") if filter_by == 'location' \
+            else (column >= search_query) & (column < search_query + '\uffff')
+        rows = db.session.query(ParkingLot.lot_id).filter(prefix) \
+            .order_by(column, ParkingLot.lot_id).offset(offset).limit(per_page + 1).all()
+        lots = get_lots([row.lot_id for row in rows])
+    else:
+        phrase = search_query.replace('"', '""')
+        lot_ids = db.session.execute(text(
+            "SELECT rowid FROM lot_search WHERE lot_search MATCH :match "
+            "ORDER BY rank, rowid LIMIT :limit OFFSET :offset"
+        ), {'match': f'{column.key} : "{phrase}"', 'limit': per_page + 1, 'offset': offset}).scalars().all()
+        lots = get_lots(lot_ids)
+    return lots[:per_page], len(lots) > per_page
+
 @app.route('/admin/search', methods=['GET'])
 def admin_search():
     filter_by = request.args.get('filter_by')
     search_query = request.args.get('search_query')
+    page = request.args.get('page', 1, type=int)
     results = []
-    if filter_by and search_query:
-        if filter_by == "location":
-            results = ParkingLot.query.filter(ParkingLot.prime_location_name.ilike(f"%{search_query}%")).all()
-        elif filter_by == "pincode":
-            results = ParkingLot.query.filter(ParkingLot.pincode.ilike(f"%{search_query}%")).all()
-    return render_template('admin_search.html', results=results)
+    has_next = False
+    if filter_by in SEARCH_COLUMNS and search_query:
+        results, has_next = search_lots(search_query, filter_by, page)
+    spots = spots_by_lot([lot['lot_id'] for lot in results]) if results else {}
+    return render_template('admin_search.html', results=results, spots_by_lot=spots, page=page, has_next=has_next,
+                           filter_by=filter_by, search_query=search_query)
 
 @app.route('/admin/summary')
 def admin_summary():
-    lots = ParkingLot.query.all()
+    lots = get_all_lots()
+    revenues = lot_revenue(lots)
     total_spots = 0
     total_occupied = 0
     total_revenue = 0.0
     summary = []
-    ist = pytz.timezone('Asia/Kolkata')
-    now = datetime.utcnow().replace(tzinfo=pytz.utc).astimezone(ist)
     for lot in lots:
-        occupied = 0
-        available = 0
-        for s in lot.spots:
-            if s.status=='O':
-                occupied=occupied+1
-            else:
-                available=available+1
-        total = occupied + available
-        reservations = Reservation.query.join(ParkingSpot).filter(ParkingSpot.lot_id == lot.lot_id).all()
-        revenue = 0.0
-        for res in reservations:
-            if res.total_cost:
-                revenue += res.total_cost
-            elif res.parking_timestamp:
-                parked_time = res.parking_timestamp.replace(tzinfo=pytz.utc).astimezone(ist)
-                if res.leaving_timestamp:
-                    left_time = res.leaving_timestamp.replace(tzinfo=pytz.utc).astimezone(ist)
-                else:
-                    left_time = now  
-                duration = (left_time - parked_time).total_seconds() / 3600
-                estimated_cost = round(duration * lot.price_per_hour, 2)
-                revenue += estimated_cost
+        total = lot['occupied_count'] + lot['available_count']
+        revenue = revenues.get(lot['lot_id'], 0.0)
         total_spots += total
-        total_occupied += occupied
+        total_occupied += lot['occupied_count']
         total_revenue += revenue
         summary.append({
-            'lot_id': lot.lot_id,
-            'name': lot.prime_location_name,
-            'rate': lot.price_per_hour,
-            'occupied': occupied,
-            'available': available,
+            'lot_id': lot['lot_id'],
+            'name': lot['prime_location_name'],
+            'rate': lot['price_per_hour'],
+            'occupied': lot['occupied_count'],
+            'available': lot['available_count'],
             'total': total,
             'revenue': round(revenue, 2)
         })
@@ -351,19 +1176,73 @@ def admin_summary():
 
 def get_current_user():
     u_id = session.get('u_id')
-    if u_id:
-        return User.query.filter_by(u_id=u_id).first()
-    return None
+    if not u_id:
+        return None
+    cached = session.get('current_user')
+    if cached and cached.get('u_id') == u_id:
+        return CurrentUser(**cached)
+    user = get_user_profile(u_id)
+    if user:
+        session['current_user'] = CurrentUser(user.u_id, user.name)._asdict()
+    return user
+
+@app.template_filter('ist')
+def to_ist(value, fmt='%Y-%m-%d %H:%M'):
+    if value is None:
+        return ''
+    return value.replace(tzinfo=ZoneInfo("UTC")).astimezone(ZoneInfo("Asia/Kolkata")).strftime(fmt)
+
+def history_query(user_id, model=Reservation):
+    return db.session.query(
+        model.res_id,
+        model.vehicle_no,
+        model.parking_timestamp,
+        model.leaving_timestamp,
+        model.total_cost,
+        ParkingLot.prime_location_name.label('location')
+    ).outerjoin(ParkingSpot, model.spot_id == ParkingSpot.spot_id) \
+     .outerjoin(ParkingLot, ParkingSpot.lot_id == ParkingLot.lot_id) \
+     .filter(model.user_id == user_id) \
+     .order_by(model.parking_timestamp.desc(), model.res_id.desc())
+
+def history_key(row):
+    return row.parking_timestamp, row.res_id
+
+def encode_history_cursor(row):
+    return f"{row.parking_timestamp.isoformat()}|{row.res_id}"
+
+def decode_history_cursor(cursor):
+    try:
+        timestamp, res_id = cursor.rsplit('|', 1)
+        return datetime.fromisoformat(timestamp), int(res_id)
+    except (AttributeError, ValueError):
+        return None
 
-def get_parking_history(user_id):
-    history = Reservation.query.filter_by(user_id=user_id).order_by(Reservation.parking_timestamp.desc()).all()
-    for res in history:
-        res.parking_timestamp = res.parking_timestamp.replace(tzinfo=ZoneInfo("UTC")).astimezone(ZoneInfo("Asia/Kolkata"))
-    return history or []
+def get_parking_history(user_id, before=None, limit=None):
+    if limit is None:
+        limit = app.config['HISTORY_PAGE_SIZE']
+    position = decode_history_cursor(before)
 
-def get_lots_by_location(location):
-    lots = ParkingLot.query.filter(ParkingLot.prime_location_name.ilike(f"%{location}%")).all()
-    return lots or []
+    def page(model, floor=None):
+        query = history_query(user_id, model)
+        key = tuple_(model.parking_timestamp, model.res_id)
+        if position:
+            query = query.filter(key < tuple_(*position))
+        if floor:
+            query = query.filter(key >= tuple_(*floor))
+        return query.limit(limit + 1).all()
+
+    rows = page(Reservation)
+    # A full page of hot rows only needs archived rows that sort inside it.
+    floor = history_key(rows[limit - 1]) if len(rows) > limit else None
+    archived = page(ArchivedReservation, floor)
+    if archived:
+        rows = sorted(rows + archived, key=history_key, reverse=True)
+    next_cursor = encode_history_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+def get_lots_by_location(location, page=1):
+    return search_lots(location, 'location', page)
 
 @app.route('/user')
 def user_dashboard():
@@ -371,15 +1250,58 @@ def user_dashboard():
     if not user:
         flash("Please log in to continue.", "warning")
         return redirect(url_for('login')) 
-    history = get_parking_history(user.u_id)
+    history, next_cursor = get_parking_history(user.u_id, before=request.args.get("before"))
     location = request.args.get("location", "")
-    lots = get_lots_by_location(location)
-    return render_template("user_dashboard.html", user=user, history=history, location=location, lots=lots)
+    lot_page = request.args.get("lot_page", 1, type=int)
+    lots, more_lots = get_lots_by_location(location, lot_page)
+    return render_template("user_dashboard.html", user=user, history=history, next_cursor=next_cursor,
+                           location=location, lots=lots, lot_page=lot_page, more_lots=more_lots)
+
+@app.route('/user/history.csv')
+def export_parking_history():
+    user = get_current_user()
+    if not user:
+        flash("Please log in to continue.", "warning")
+        return redirect(url_for('login'))
+    user_id = user.u_id
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(['ID', 'Location', 'Vehicle No', 'Parked At', 'Left At', 'Cost'])
+        rows = heapq.merge(history_query(user_id).yield_per(500),
+                           history_query(user_id, ArchivedReservation).yield_per(500),
+                           key=history_key, reverse=True)
+        for row in rows:
+            writer.writerow([row.res_id, row.location, row.vehicle_no,
+                             to_ist(row.parking_timestamp), to_ist(row.leaving_timestamp),
+                             '' if row.total_cost is None else row.total_cost])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+        yield buffer.getvalue()
+
+    return Response(stream_with_context(generate()), mimetype='text/csv',
+                    headers={'Content-Disposition': 'attachment; filename=parking_history.csv'})
+
+def claim_spot(lot_id, attempts=5):
+    for _ in range(attempts):
+        spot_id = db.session.query(ParkingSpot.spot_id).filter_by(lot_id=lot_id, status='A').limit(1).scalar()
+        if spot_id is None:
+            return None
+        claimed = ParkingSpot.query.filter_by(spot_id=spot_id, status='A') \
+            .update({ParkingSpot.status: 'O'}, synchronize_session=False)
+        if claimed:
+            return spot_id
+    return None
 
-def reserve_spot(user_id, spot_id, lot_id, vehicle_no):
-    spot = ParkingSpot.query.get(spot_id)
-    if spot:
-        spot.status = 'O'
+@retry_on_busy
+def reserve_spot(user_id, lot_id, vehicle_no):
+    try:
+        spot_id = claim_spot(lot_id)
+        if spot_id is None:
+            db.session.rollback()
+            return None
         reservation = Reservation(
             user_id=user_id,
             spot_id=spot_id,
@@ -387,52 +1309,71 @@ def reserve_spot(user_id, spot_id, lot_id, vehicle_no):
             parking_timestamp=datetime.utcnow()
         )
         db.session.add(reservation)
+        adjust_lot_counters(lot_id, occupied=1, available=-1, active=1)
         db.session.commit()
-
-def get_available_spot(lot_id):
-    return ParkingSpot.query.filter_by(lot_id=lot_id, status='A').first()
+        invalidate_lot(lot_id)
+        spot_events.publish('spot', lot_id=lot_id, spot_id=spot_id, status='O')
+        return reservation
+    except Exception:
+        db.session.rollback()
+        raise
 
 @app.route('/user/book/<int:lot_id>', methods=['GET', 'POST'])
 def book_parking_spot(lot_id):
     user = get_current_user()
-    spot = get_available_spot(lot_id)
-    if not spot:
-        flash("No available spots in this lot!", "warning")
-        return redirect('/user')
+    if not user:
+        flash("Please log in to continue.", "warning")
+        return redirect(url_for('login'))
     if request.method == 'POST':
         vehicle_no = request.form['vehicle_no']
-        reserve_spot(user.u_id, spot.spot_id, lot_id, vehicle_no)
+        if not reserve_spot(user.u_id, lot_id, vehicle_no):
+            flash("No available spots in this lot!", "warning")
+        return redirect('/user')
+    # The spot is only picked by claim_spot on POST, so the page shows the lot rather than a spot it may not get.
+    lot = get_lot(lot_id)
+    if not lot or lot['available_count'] <= 0:
+        flash("No available spots in this lot!", "warning")
         return redirect('/user')
-    return render_template("book_parking_spot.html", user=user, spot=spot)
+    return render_template("book_parking_spot.html", user=user, lot=lot)
 
+def lot_pricing(lot_id):
+    # The billed amount always comes from the lot row; cached snapshots only back what pages display.
+    price_per_hour, pricing_rules = db.session.query(ParkingLot.price_per_hour, ParkingLot.pricing_rules) \
+        .filter_by(lot_id=lot_id).one()
+    return price_per_hour, json.loads(pricing_rules) if pricing_rules else None
+
+@retry_on_busy
 def release_spot(booking_id):
     reservation = Reservation.query.get(booking_id)
     if reservation and not reservation.leaving_timestamp:
         spot = ParkingSpot.query.get(reservation.spot_id)
-        lot = ParkingLot.query.get(spot.lot_id)
+        price_per_hour, pricing_rules = lot_pricing(spot.lot_id)
         now = datetime.utcnow()
-        duration = (now - reservation.parking_timestamp).total_seconds() / 3600
-        cost = round(duration * lot.price_per_hour, 2)
-        reservation.leaving_timestamp = now
-        reservation.total_cost = cost
+        cost = billing.reservation_cost(reservation.parking_timestamp, now, price_per_hour, pricing_rules)
+        closed = Reservation.query.filter_by(res_id=booking_id, leaving_timestamp=None) \
+            .update({Reservation.leaving_timestamp: now, Reservation.total_cost: cost}, synchronize_session='fetch')
+        if not closed:
+            db.session.rollback()
+            return
         spot.status = 'A'  
+        adjust_lot_counters(spot.lot_id, occupied=-1, available=1, active=-1, revenue=cost)
+        record_revenue(spot.lot_id, now, cost)
         db.session.commit()
+        invalidate_lot(spot.lot_id)
+        spot_events.publish('spot', lot_id=spot.lot_id, spot_id=spot.spot_id, status='A')
 
 def get_release_details(booking_id):
     reservation = Reservation.query.get(booking_id)
     if reservation:
         spot = ParkingSpot.query.get(reservation.spot_id)
-        lot = ParkingLot.query.get(spot.lot_id)
-        ist = pytz.timezone('Asia/Kolkata')
-        now = datetime.utcnow().replace(tzinfo=pytz.utc).astimezone(ist)
-        parked_time = parked_time = reservation.parking_timestamp.replace(tzinfo=pytz.utc).astimezone(ist)
-        duration = (now - parked_time).total_seconds() / 3600  
-        cost = round(duration * lot.price_per_hour, 2)
+        lot = get_lot(spot.lot_id)
+        now = datetime.utcnow()
+        cost = billing.reservation_cost(reservation.parking_timestamp, now, lot['price_per_hour'], lot['pricing_rules'])
         return {
                 'spot_id': spot.spot_id,
                 'vehicle_no': reservation.vehicle_no,
-                'park_time': parked_time.strftime('%Y-%m-%d %H:%M:%S'),
-                'release_time': now.strftime('%Y-%m-%d %H:%M:%S'),
+                'park_time': to_ist(reservation.parking_timestamp, '%Y-%m-%d %H:%M:%S'),
+                'release_time': to_ist(now, '%Y-%m-%d %H:%M:%S'),
                 'cost': cost
                }
     return None
@@ -447,7 +1388,7 @@ def release_parking_spot(booking_id):
 
 @app.route('/edit_profile', methods=['GET', 'POST'])
 def edit_profile():
-    user = get_current_user()
+    user = get_user_profile(session['u_id']) if 'u_id' in session else None
     if not user:
         flash("Please log in first.", "warning")
         return redirect(url_for('login'))
@@ -459,13 +1400,16 @@ def edit_profile():
         if not name or not address or not pincode:
             flash("All fields except password are required.", "danger")
         else:
+            user = User.query.get(user.u_id)
             user.name = name
             user.address = address
             user.pincode = pincode
             if password:
-                user.password = generate_password_hash(password)
+                user.password = hash_password(password)
             try:
                 db.session.commit()
+                cache_current_user(user)
+                session['name'] = user.name
                 flash("Profile updated successfully!","success")
                 return redirect(url_for('user_dashboard'))
             except Exception as e:
@@ -473,36 +1417,184 @@ def edit_profile():
                 flash(f"Error updating profile:{str(e)}","danger")
     return render_template('edit_profile.html', user=user)
 
+def user_usage(user_id):
+    lot_rows = db.session.query(
+        ParkingLot.lot_id,
+        ParkingLot.prime_location_name,
+        func.count(Reservation.res_id),
+        func.coalesce(func.sum(Reservation.total_cost), 0.0)
+    ).select_from(Reservation) \
+     .outerjoin(ParkingSpot, Reservation.spot_id == ParkingSpot.spot_id) \
+     .outerjoin(ParkingLot, ParkingSpot.lot_id == ParkingLot.lot_id) \
+     .filter(Reservation.user_id == user_id) \
+     .group_by(ParkingLot.lot_id).all()
+    archived_lot_rows = db.session.query(
+        ParkingLot.lot_id,
+        ParkingLot.prime_location_name,
+        func.sum(UserUsageRollup.reservation_count),
+        func.sum(UserUsageRollup.spent)
+    ).select_from(UserUsageRollup) \
+     .outerjoin(ParkingLot, UserUsageRollup.lot_id == ParkingLot.lot_id) \
+     .filter(UserUsageRollup.user_id == user_id) \
+     .group_by(ParkingLot.lot_id).all()
+    total_bookings = 0
+    total_spent = 0
+    lot_usage = {}
+    for lot_id, location, count, spent in lot_rows + archived_lot_rows:
+        total_bookings += count
+        total_spent += spent
+        lot_usage.setdefault(lot_id, {'location': location, 'count': 0})['count'] += count
+    month = func.strftime('%Y-%m', Reservation.parking_timestamp, '+330 minutes')
+    monthly = {}
+    for row in db.session.query(month, func.count(Reservation.res_id), func.coalesce(func.sum(Reservation.total_cost), 0.0)) \
+            .filter(Reservation.user_id == user_id).group_by(month).all() + \
+            db.session.query(UserUsageRollup.month, func.sum(UserUsageRollup.reservation_count), func.sum(UserUsageRollup.spent)) \
+            .filter(UserUsageRollup.user_id == user_id).group_by(UserUsageRollup.month).all():
+        usage = monthly.setdefault(row[0], {'month': row[0], 'count': 0, 'spent': 0.0})
+        usage['count'] += row[1]
+        usage['spent'] += row[2]
+    monthly_usage = [dict(usage, spent=round(usage['spent'], 2)) for _, usage in sorted(monthly.items(), reverse=True)]
+    return {
+        'total_bookings': total_bookings,
+        'total_spent': round(total_spent, 2),
+        'lot_usage': lot_usage,
+        'monthly_usage': monthly_usage
+    }
+
 @app.route('/user/summary')
 def user_summary():
     if 'u_id' not in session:
         flash("Please log in to view summary", "warning")
         return redirect(url_for('login'))
-    user_id = session['u_id']
-    user = User.query.get(user_id) 
-    reservations = Reservation.query.filter_by(user_id=user_id).all()
-    total_bookings = len(reservations)
-    total_spent = 0
-    for r in reservations:
-        if r.total_cost:
-            total_spent=total_spent+r.total_cost
-        else:
-            total_spent=total_spent
-    lot_usage = {}
-    for r in reservations:
-        lot = r.spot.lot
-        if lot.lot_id not in lot_usage:
-            lot_usage[lot.lot_id] = {
-                'location': lot.prime_location_name,
-                'count': 1
-            }
-        else:
-            lot_usage[lot.lot_id]['count'] += 1
-    return render_template('user_summary.html',
-                           user=user, 
-                           total_bookings=total_bookings,
-                           total_spent=round(total_spent, 2),
-                           lot_usage=lot_usage)
+    user = get_current_user()
+    return render_template('user_summary.html', user=user, **user_usage(session['u_id']))
+
+LOT_API_FIELDS = ('lot_id', 'prime_location_name', 'address', 'pincode', 'price_per_hour', 'max_spots',
+                  'occupied_count', 'available_count', 'pricing_rules', 'version')
+HISTORY_API_FIELDS = ('res_id', 'location', 'vehicle_no', 'parking_timestamp', 'leaving_timestamp', 'total_cost')
+
+def api_abort(status, message):
+    response = jsonify({'error': message})
+    response.status_code = status
+    abort(response)
+
+def api_fields(allowed):
+    fields = [field.strip() for field in request.args.get('fields', '').split(',') if field.strip()]
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        api_abort(400, f"Unknown fields: {', '.join(unknown)}")
+    return fields or list(allowed)
+
+def api_page_size(default):
+    per_page = request.args.get('per_page', request.args.get('limit', default, type=int), type=int)
+    return min(max(per_page, 1), app.config['API_MAX_PAGE_SIZE'])
+
+def api_timestamp(value):
+    return value.isoformat() + 'Z' if value else None
+
+def api_not_modified(etag):
+    # Lets polling clients skip the query and serialisation entirely when the version still matches.
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return None
+
+def api_response(payload, etag=None, private=False):
+    body = json.dumps(payload).encode()
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag or hashlib.sha1(body).hexdigest(), weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache' if private else 'no-cache'
+    response.vary.add('Accept-Encoding')
+    response.make_conditional(request)
+    if response.status_code == 200 and len(body) >= app.config['API_GZIP_MIN_BYTES'] \
+            and 'gzip' in request.accept_encodings:
+        response.set_data(gzip.compress(body))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+def api_user():
+    user = get_current_user()
+    if not user:
+        api_abort(401, "Login required")
+    return user
+
+@app.route('/api/v1/lots')
+def api_lots():
+    fields = api_fields(LOT_API_FIELDS)
+    etag = f"lots-{lots_version()}"
+    not_modified = api_not_modified(etag)
+    if not_modified:
+        return not_modified
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = api_page_size(app.config['API_PAGE_SIZE'])
+    lots = ParkingLot.query.order_by(ParkingLot.lot_id).offset((page - 1) * per_page).limit(per_page + 1).all()
+    data = []
+    for lot in lots[:per_page]:
+        snapshot = lot_snapshot(lot)
+        data.append({field: snapshot[field] for field in fields})
+    return api_response({'data': data, 'page': page, 'per_page': per_page, 'has_next': len(lots) > per_page}, etag)
+
+@app.route('/api/v1/lots/<int:lot_id>')
+def api_lot(lot_id):
+    fields = api_fields(LOT_API_FIELDS + ('spots',))
+    version = db.session.query(ParkingLot.version).filter_by(lot_id=lot_id).scalar()
+    if version is None:
+        api_abort(404, "Lot not found")
+    etag = f"lot-{lot_id}-{version}"
+    not_modified = api_not_modified(etag)
+    if not_modified:
+        return not_modified
+    lot = db.session.get(ParkingLot, lot_id)
+    if lot is None:
+        api_abort(404, "Lot not found")
+    snapshot = lot_snapshot(lot)
+    if 'spots' in fields:
+        snapshot['spots'] = [{'spot_id': spot_id, 'status': status} for spot_id, status in
+                             db.session.query(ParkingSpot.spot_id, ParkingSpot.status)
+                             .filter_by(lot_id=lot_id).order_by(ParkingSpot.spot_id)]
+    return api_response({'data': {field: snapshot[field] for field in fields}}, f"lot-{lot_id}-{lot.version}")
+
+@app.route('/api/v1/me/history')
+def api_history():
+    user = api_user()
+    fields = api_fields(HISTORY_API_FIELDS)
+    rows, next_cursor = get_parking_history(user.u_id, request.args.get('before'),
+                                            api_page_size(app.config['HISTORY_PAGE_SIZE']))
+    data = []
+    for row in rows:
+        item = {'res_id': row.res_id, 'location': row.location, 'vehicle_no': row.vehicle_no,
+                'parking_timestamp': api_timestamp(row.parking_timestamp),
+                'leaving_timestamp': api_timestamp(row.leaving_timestamp), 'total_cost': row.total_cost}
+        data.append({field: item[field] for field in fields})
+    return api_response({'data': data, 'next': next_cursor}, private=True)
+
+@app.route('/api/v1/me/summary')
+def api_summary():
+    user = api_user()
+    usage = user_usage(user.u_id)
+    usage['lot_usage'] = [dict(lot_id=lot_id, **lot) for lot_id, lot in usage['lot_usage'].items()]
+    return api_response({'data': usage}, private=True)
+
+def create_app():
+    # Safe to call more than once; schema changes only happen through `flask migrate`.
+    global lot_cache
+    if 'sqlalchemy' in app.extensions:
+        return app
+    app.config.from_prefixed_env()
+    lot_cache = cache_from_config(app.config)
+    configure_sqlite(app)
+    db.init_app(app)
+    with app.app_context():
+        if app.config['SQLITE_TUNING']:
+            event.listen(db.engine, 'connect', apply_sqlite_pragmas)
+        metrics.init_app(app, db.engine)
+    return app
+
+create_app()
 
 if __name__ == '__main__':
-   app.run(debug=True)
\ No newline at end of file
+    with app.app_context():
+        init_db()
+    app.run(debug=True)
\ No newline at end of file
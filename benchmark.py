@@ -0,0 +1,272 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+PASSWORD = 'bench-password'
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+class Recorder:
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.local = threading.local()
+        self.results = {}
+        self.wall_seconds = {}
+        self.lock = threading.Lock()
+        event.listen(engine, 'after_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.local.queries = getattr(self.local, 'queries', 0) + 1
+
+    def call(self, scenario, method, *args, **kwargs):
+        before = getattr(self.local, 'queries', 0)
+        started = time.perf_counter()
+        response = method(*args, **kwargs)
+        elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise RuntimeError(f"{scenario}: HTTP {response.status_code} for {args[0]}")
+        with self.lock:
+            samples = self.results.setdefault(scenario, {'latencies': [], 'queries': []})
+            samples['latencies'].append(elapsed)
+            samples['queries'].append(getattr(self.local, 'queries', 0) - before)
+        return response
+
+    def report(self):
+        report = {}
+        for scenario, samples in self.results.items():
+            latencies = samples['latencies']
+            total = self.wall_seconds.get(scenario, sum(latencies))
+            report[scenario] = {
+                'requests': len(latencies),
+                'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+                'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+                'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+                'throughput_rps': round(len(latencies) / total, 2) if total else 0.0,
+                'queries_mean': round(sum(samples['queries']) / len(samples['queries']), 2),
+                'queries_max': max(samples['queries'])
+            }
+        return report
+
+def seed_data(m, lots, spots, users, reservations, rng):
+    from werkzeug.security import generate_password_hash
+    from sqlalchemy import text
+    password = generate_password_hash(PASSWORD)
+    for i in range(lots):
+        lot = m.ParkingLot(prime_location_name=f"Bench Lot {i}", address=f"{i} Bench Road",
+                           pincode=str(600000 + i), price_per_hour=rng.choice([10.0, 20.0, 40.0]),
+                           max_spots=spots, occupied_count=0, available_count=spots, active_reservation_count=0)
+        m.db.session.add(lot)
+        m.db.session.flush()
+        m.provision_spots(lot.lot_id, spots)
+    m.db.session.execute(text("INSERT INTO user (email, password, name, address, pincode) VALUES (:email, :password, :name, :address, :pincode)"),
+                         [{'email': f"seed{i}@bench.test", 'password': password, 'name': f"Seed {i}",
+                           'address': 'Bench', 'pincode': 600000} for i in range(users)])
+    m.db.session.commit()
+    spot_ids = [row.spot_id for row in m.db.session.query(m.ParkingSpot.spot_id)]
+    user_ids = [row.u_id for row in m.db.session.query(m.User.u_id)]
+    start = datetime.utcnow() - timedelta(days=365)
+    batch = []
+    for i in range(reservations):
+        parked = start + timedelta(minutes=rng.randrange(365 * 24 * 60))
+        hours = rng.uniform(0.25, 8)
+        batch.append({'spot_id': rng.choice(spot_ids), 'user_id': rng.choice(user_ids), 'vehicle_no': f"TN{i:08d}",
+                      'parked': parked, 'left': parked + timedelta(hours=hours), 'cost': round(hours * 20, 2)})
+        if len(batch) == 10000 or i == reservations - 1:
+            m.db.session.execute(text("INSERT INTO reservation (spot_id, user_id, vehicle_no, parking_timestamp, leaving_timestamp, total_cost) "
+                                      "VALUES (:spot_id, :user_id, :vehicle_no, :parked, :left, :cost)"), batch)
+            m.db.session.commit()
+            batch = []
+    m.backfill_revenue()
+    m.rebuild_lot_counters()
+
+def concurrent_bookings(m, recorder, clients, lot_ids, threads, rounds):
+    def worker(client, email):
+        for _ in range(rounds):
+            recorder.call('concurrent_book', client.post, f"/user/book/{lot_ids[0]}", data={'vehicle_no': email[:20]})
+            with m.app.app_context():
+                res_id = m.db.session.query(m.Reservation.res_id).join(m.User, m.Reservation.user_id == m.User.u_id) \
+                    .filter(m.User.email == email, m.Reservation.leaving_timestamp.is_(None)).limit(1).scalar()
+            if res_id is not None:
+                recorder.call('concurrent_release', client.post, f"/user/release/{res_id}")
+
+    workers = [threading.Thread(target=worker, args=client) for client in clients[:threads]]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    recorder.wall_seconds['concurrent_book'] = elapsed
+    recorder.wall_seconds['concurrent_release'] = elapsed
+
+def summary_scaling(m, recorder, sizes, rng):
+    from sqlalchemy import text
+    queries = {}
+    for size in sizes:
+        email = f"history{size}@bench.test"
+        client = m.app.test_client()
+        client.post('/register', data={'email': email, 'password': PASSWORD, 'name': f"History {size}",
+                                       'address': 'Bench', 'pincode': '600000'})
+        client.post('/login', data={'email': email, 'password': PASSWORD})
+        with m.app.app_context():
+            user_id = m.db.session.query(m.User.u_id).filter_by(email=email).scalar()
+            spot_ids = [row.spot_id for row in m.db.session.query(m.ParkingSpot.spot_id)]
+            start = datetime.utcnow() - timedelta(days=365)
+            rows = []
+            for i in range(size):
+                parked = start + timedelta(minutes=rng.randrange(365 * 24 * 60))
+                rows.append({'spot_id': rng.choice(spot_ids), 'user_id': user_id, 'vehicle_no': f"HS{i:08d}",
+                             'parked': parked, 'left': parked + timedelta(hours=2), 'cost': 40.0})
+            if rows:
+                m.db.session.execute(text("INSERT INTO reservation (spot_id, user_id, vehicle_no, parking_timestamp, leaving_timestamp, total_cost) "
+                                          "VALUES (:spot_id, :user_id, :vehicle_no, :parked, :left, :cost)"), rows)
+                m.db.session.commit()
+        scenario = f'user_summary_history_{size}'
+        recorder.call(scenario, client.get, '/user/summary')
+        queries[size] = recorder.results[scenario]['queries'][-1]
+    return {'queries_by_history_size': queries, 'constant': len(set(queries.values())) <= 1}
+
+def provisioning(m, recorder, admin, sizes):
+    from sqlalchemy import func
+    for size in sizes:
+        form = {'name': f"Provision {size}", 'address': 'Bench', 'pincode': '600000', 'price': '20', 'max_spots': str(size)}
+        recorder.call(f'provision_{size}', admin.post, '/add_parking_lot', data=form)
+        with m.app.app_context():
+            lot_id = m.db.session.query(func.max(m.ParkingLot.lot_id)).scalar()
+        recorder.call(f'shrink_{size}', admin.post, f"/edit_parking_lot/{lot_id}",
+                      data={'prime_location_name': form['name'], 'address': 'Bench', 'pincode': '600000',
+                            'price_per_hour': '20', 'max_spots': str(size // 2)})
+        recorder.call(f'delete_lot_{size}', admin.post, f"/delete_parking_lot/{lot_id}")
+
+def bulk_import(m, rows, rng):
+    with m.app.app_context():
+        spot_ids = [row.spot_id for row in m.db.session.query(m.ParkingSpot.spot_id)]
+        user_ids = [row.u_id for row in m.db.session.query(m.User.u_id)]
+    start = datetime.utcnow() - timedelta(days=365)
+    with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as f:
+        for i in range(rows):
+            parked = start + timedelta(minutes=rng.randrange(365 * 24 * 60))
+            f.write(json.dumps({'spot_id': rng.choice(spot_ids), 'user_id': rng.choice(user_ids), 'vehicle_no': f"IM{i:08d}",
+                                'parking_timestamp': parked.isoformat(),
+                                'leaving_timestamp': (parked + timedelta(hours=rng.uniform(0.25, 8))).isoformat()}) + '\n')
+    try:
+        with m.app.app_context(), open(f.name, 'rb') as source:
+            started = time.perf_counter()
+            result = m.bulk_import('reservations', source, 'jsonl')
+            elapsed = time.perf_counter() - started
+    finally:
+        os.unlink(f.name)
+    return {'rows': rows, 'imported': result['imported'], 'failed': result['failed'], 'seconds': round(elapsed, 3),
+            'rows_per_second': round(rows / elapsed, 1) if elapsed else 0.0}
+
+def run(args):
+    db_path = os.path.join(tempfile.mkdtemp(prefix='parking-bench-'), 'bench.sqlite3')
+    os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+    if args.sqlite_defaults:
+        os.environ['FLASK_SQLITE_TUNING'] = 'false'
+        os.environ['FLASK_DB_BUSY_RETRIES'] = '0'
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app as m
+    rng = random.Random(args.seed)
+    with m.app.app_context():
+        m.init_db()
+        started = time.perf_counter()
+        seed_data(m, args.lots, args.spots, args.users, args.reservations, rng)
+        seed_seconds = time.perf_counter() - started
+        lot_ids = [row.lot_id for row in m.db.session.query(m.ParkingLot.lot_id)]
+        recorder = Recorder(m.db.engine)
+
+    anonymous = m.app.test_client()
+    for _ in range(args.iterations):
+        recorder.call('login_page', anonymous.get, '/login')
+    admin = m.app.test_client()
+    admin.post('/login', data={'email': 'abc@gmail.com', 'password': 'Shreya@123'})
+    clients = []
+    for i in range(args.iterations):
+        email = f"bench{i}@bench.test"
+        client = m.app.test_client()
+        recorder.call('register', client.post, '/register', data={'email': email, 'password': PASSWORD, 'name': f"Bench {i}",
+                                                                   'address': 'Bench', 'pincode': '600000'})
+        recorder.call('login', client.post, '/login', data={'email': email, 'password': PASSWORD})
+        clients.append((client, email))
+    for client, email in clients:
+        recorder.call('book', client.post, f"/user/book/{rng.choice(lot_ids)}", data={'vehicle_no': email[:20]})
+    with m.app.app_context():
+        bookings = {email: res_id for email, res_id in m.db.session.query(m.User.email, m.Reservation.res_id)
+                    .join(m.Reservation, m.Reservation.user_id == m.User.u_id)
+                    .filter(m.Reservation.leaving_timestamp.is_(None))}
+    for _ in range(args.iterations):
+        recorder.call('admin_dashboard', admin.get, '/admin_dashboard')
+        recorder.call('admin_summary', admin.get, '/admin/summary')
+    for client, email in clients:
+        recorder.call('user_summary', client.get, '/user/summary')
+        if email in bookings:
+            recorder.call('release', client.post, f"/user/release/{bookings[email]}")
+    if args.threads:
+        concurrent_bookings(m, recorder, clients, lot_ids, args.threads, args.rounds)
+    summary_report = summary_scaling(m, recorder, args.history_sizes, rng)
+    provisioning(m, recorder, admin, args.provision_sizes)
+    import_report = bulk_import(m, args.import_rows, rng) if args.import_rows else None
+
+    return {
+        'commit': git_commit(),
+        'timestamp': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'python': platform.python_version(),
+        'params': {'lots': args.lots, 'spots': args.spots, 'users': args.users,
+                   'reservations': args.reservations, 'iterations': args.iterations, 'seed': args.seed,
+                   'threads': args.threads, 'rounds': args.rounds, 'sqlite_defaults': args.sqlite_defaults,
+                   'import_rows': args.import_rows, 'provision_sizes': args.provision_sizes,
+                   'history_sizes': args.history_sizes},
+        'seed_seconds': round(seed_seconds, 3),
+        'scenarios': recorder.report(),
+        'user_summary_scaling': summary_report,
+        'bulk_import': import_report
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the booking lifecycle against a synthetic database.')
+    parser.add_argument('--lots', type=int, default=20)
+    parser.add_argument('--spots', type=int, default=50, help='spots per lot')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--reservations', type=int, default=10000, help='closed historical reservations')
+    parser.add_argument('--iterations', type=int, default=50, help='requests per scenario')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--threads', type=int, default=0, help='concurrent booking workers (0 skips the scenario)')
+    parser.add_argument('--rounds', type=int, default=10, help='book/release cycles per concurrent worker')
+    parser.add_argument('--history-sizes', type=lambda value: [int(size) for size in value.split(',') if size],
+                        default=[0, 100, 1000, 10000], help='reservation counts to give users before timing /user/summary')
+    parser.add_argument('--provision-sizes', type=lambda value: [int(size) for size in value.split(',') if size],
+                        default=[1000, 10000, 100000], help='comma-separated lot sizes to create, halve and delete')
+    parser.add_argument('--import-rows', type=int, default=0, help='reservations to stream through the bulk importer (0 skips it)')
+    parser.add_argument('--sqlite-defaults', action='store_true', help='disable the SQLite pragmas, pool tuning and busy retries')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+    report = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + '\n')
+    else:
+        print(report)
+
+if __name__ == '__main__':
+    main()
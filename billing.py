@@ -0,0 +1,85 @@
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+EPOCH = datetime(1970, 1, 1)
+IST_OFFSET = 5.5 * 3600
+DAY = 24 * 3600
+
+# Pricing rules are plain dicts so they can be stored as JSON on the lot:
+#   {"tiers": [[2, 0.8], [6, 0.5]]}   hours past 2 cost 80%, hours past 6 cost 50%
+#   {"peak": {"windows": [[8, 10], [17, 20]], "multiplier": 1.5}}   IST hours billed at 150%
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def validate_rules(rules):
+    # Raises ValueError with a message fit for a flash or an import report.
+    if not isinstance(rules, dict):
+        raise ValueError("pricing rules must be a JSON object")
+    tiers = rules.get('tiers', [])
+    if not isinstance(tiers, list) or not all(
+            isinstance(tier, list) and len(tier) == 2 and all(map(_is_number, tier)) for tier in tiers):
+        raise ValueError("tiers must be a list of [after_hours, multiplier] pairs")
+    peak = rules.get('peak')
+    if peak is None:
+        return rules
+    if not isinstance(peak, dict) or not _is_number(peak.get('multiplier')):
+        raise ValueError("peak must have a numeric multiplier")
+    windows = peak.get('windows')
+    if not isinstance(windows, list) or not all(
+            isinstance(window, list) and len(window) == 2 and all(map(_is_number, window))
+            and 0 <= window[0] < window[1] <= 24 for window in windows):
+        # Overnight windows like [22, 6] would bill nothing; split them into [22, 24] and [0, 6].
+        raise ValueError("peak windows must be [start, end] IST hours with 0 <= start < end <= 24")
+    return rules
+
+def to_epoch(value):
+    return (value - EPOCH).total_seconds()
+
+def _peak_seconds_before(t, start, end, floor, clip):
+    local = t + IST_OFFSET
+    days = floor(local / DAY)
+    return days * (end - start) + clip(local - days * DAY - start, 0, end - start)
+
+def _billable_hours(parked, left, rules, floor, clip, maximum):
+    hours = maximum((left - parked) / 3600, 0)
+    billable = hours
+    tiers = sorted((rules or {}).get('tiers', []))
+    previous = 1.0
+    for after, multiplier in tiers:
+        billable = billable + maximum(hours - after, 0) * (multiplier - previous)
+        previous = multiplier
+    peak = (rules or {}).get('peak')
+    if peak:
+        peak_seconds = 0
+        for start, end in peak['windows']:
+            start, end = start * 3600, end * 3600
+            peak_seconds = peak_seconds + _peak_seconds_before(left, start, end, floor, clip) \
+                - _peak_seconds_before(parked, start, end, floor, clip)
+        billable = billable + maximum(peak_seconds, 0) / 3600 * (peak['multiplier'] - 1)
+    return billable
+
+def _clip(value, low, high):
+    return min(max(value, low), high)
+
+def _floor(value):
+    return value // 1
+
+def reservation_cost(parked_at, left_at, price_per_hour, rules=None):
+    hours = _billable_hours(to_epoch(parked_at), to_epoch(left_at), rules, _floor, _clip, lambda v, low: max(v, low))
+    return round(hours * price_per_hour, 2)
+
+def batch_costs(parked, left, price_per_hour, rules=None):
+    # parked/left are epoch seconds; price_per_hour is a scalar or one price per row.
+    if np is None:
+        prices = price_per_hour if isinstance(price_per_hour, (list, tuple)) else [price_per_hour] * len(parked)
+        return [round(_billable_hours(p, l, rules, _floor, _clip, lambda v, low: max(v, low)) * price, 2)
+                for p, l, price in zip(parked, left, prices)]
+    parked = np.asarray(parked, dtype=float)
+    left = np.asarray(left, dtype=float)
+    hours = _billable_hours(parked, left, rules, np.floor, np.clip, np.maximum)
+    return np.round(hours * np.asarray(price_per_hour, dtype=float), 2).tolist()
@@ -0,0 +1,145 @@
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from itertools import islice
+
+import billing
+
+FORMATS = ('csv', 'jsonl')
+
+LOT_FIELDS = ['lot_id', 'prime_location_name', 'address', 'pincode', 'price_per_hour', 'max_spots',
+              'occupied_count', 'available_count', 'pricing_rules']
+USER_FIELDS = ['u_id', 'email', 'name', 'address', 'pincode']
+RESERVATION_FIELDS = ['res_id', 'lot_id', 'spot_id', 'user_id', 'vehicle_no',
+                      'parking_timestamp', 'leaving_timestamp', 'total_cost']
+
+def read_records(stream, fmt):
+    # Yields (line number, dict) one row at a time so large files never sit in memory.
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format {fmt!r}")
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_no, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_no, e
+            continue
+        yield line_no, record if isinstance(record, dict) else ValueError("Expected a JSON object")
+
+def write_records(rows, fields, fmt):
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format {fmt!r}")
+    if fmt == 'jsonl':
+        for row in rows:
+            yield json.dumps({field: _plain(row[field]) for field in fields}) + '\n'
+        return
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for i, row in enumerate(rows, 1):
+        writer.writerow([_plain(row[field]) for field in fields])
+        if i % 500 == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+def _plain(value):
+    return value.isoformat(sep=' ') if isinstance(value, datetime) else value
+
+def _text(record, field, *aliases, required=True):
+    for key in (field,) + aliases:
+        value = record.get(key)
+        if value not in (None, ''):
+            return str(value).strip()
+    if required:
+        raise ValueError(f"{field} is required")
+    return None
+
+def _number(record, field, kind, *aliases, required=True, minimum=None):
+    value = _text(record, field, *aliases, required=required)
+    if value is None:
+        return None
+    try:
+        number = kind(value)
+    except ValueError:
+        raise ValueError(f"{field} must be {'an integer' if kind is int else 'a number'}")
+    if minimum is not None and number < minimum:
+        raise ValueError(f"{field} must be at least {minimum}")
+    return number
+
+def _timestamp(record, field):
+    value = _text(record, field)
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{field} must be an ISO 8601 timestamp")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def clean_lot(record):
+    rules = record.get('pricing_rules') or None
+    if isinstance(rules, str):
+        try:
+            parsed = json.loads(rules)
+        except ValueError:
+            raise ValueError("pricing_rules must be valid JSON")
+        billing.validate_rules(parsed)
+    elif rules is not None:
+        rules = json.dumps(billing.validate_rules(rules))
+    return {
+        'prime_location_name': _text(record, 'prime_location_name', 'name'),
+        'address': _text(record, 'address'),
+        'pincode': _text(record, 'pincode'),
+        'price_per_hour': _number(record, 'price_per_hour', float, 'price', minimum=0),
+        'max_spots': _number(record, 'max_spots', int, 'spots', minimum=0),
+        'pricing_rules': rules
+    }
+
+def clean_user(record):
+    email = _text(record, 'email')
+    if '@' not in email:
+        raise ValueError("email is not valid")
+    password_hash = _text(record, 'password_hash', required=False)
+    if password_hash is not None and password_hash.count('$') != 2:
+        raise ValueError("password_hash is not a werkzeug password hash")
+    return {
+        'email': email,
+        'password': _text(record, 'password', required=password_hash is None),
+        'password_hash': password_hash,
+        'name': _text(record, 'name'),
+        'address': _text(record, 'address'),
+        'pincode': _number(record, 'pincode', int)
+    }
+
+def clean_reservation(record):
+    user_id = _number(record, 'user_id', int, required=False)
+    user_email = None if user_id is not None else _text(record, 'user_email', 'email')
+    parked = _timestamp(record, 'parking_timestamp')
+    left = _timestamp(record, 'leaving_timestamp')
+    if left < parked:
+        raise ValueError("leaving_timestamp is before parking_timestamp")
+    return {
+        'spot_id': _number(record, 'spot_id', int),
+        'user_id': user_id,
+        'user_email': user_email,
+        'vehicle_no': _text(record, 'vehicle_no'),
+        'parking_timestamp': parked,
+        'leaving_timestamp': left,
+        'total_cost': _number(record, 'total_cost', float, required=False, minimum=0)
+    }
@@ -0,0 +1,51 @@
+import json
+import threading
+from collections import deque
+
+class SpotEventBroker:
+    def __init__(self, maxlen=1000):
+        self._events = deque(maxlen=maxlen)
+        self._last_id = 0
+        self._cond = threading.Condition()
+
+    @property
+    def last_id(self):
+        return self._last_id
+
+    def publish(self, kind, **data):
+        with self._cond:
+            self._last_id += 1
+            self._events.append((self._last_id, kind, data))
+            self._cond.notify_all()
+            return self._last_id
+
+    def since(self, after, timeout=None):
+        # Returns None when the buffer no longer reaches back to `after`, so the client has to resync.
+        with self._cond:
+            if after > self._last_id:
+                # The id came from another worker or from before a restart; nothing here lines up with it.
+                return None
+            if self._last_id <= after and timeout:
+                self._cond.wait(timeout)
+            if self._last_id > after and (not self._events or self._events[0][0] > after + 1):
+                return None
+            pending = []
+            for event in reversed(self._events):
+                if event[0] <= after:
+                    break
+                pending.append(event)
+            pending.reverse()
+            return pending
+
+    def stream(self, after, heartbeat=15):
+        yield "retry: 3000\n\n"
+        while True:
+            events = self.since(after, timeout=heartbeat)
+            if events is None:
+                after = self.last_id
+                yield f"id: {after}\nevent: reset\ndata: {{}}\n\n"
+            elif not events:
+                yield ": keepalive\n\n"
+            for event_id, kind, data in events or []:
+                after = event_id
+                yield f"id: {event_id}\nevent: {kind}\ndata: {json.dumps(data)}\n\n"
@@ -0,0 +1,110 @@
+import cProfile
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class EndpointStats:
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.requests = 0
+        self.latency_sum = 0.0
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+        self.n_plus_one = 0
+
+class Metrics:
+    def __init__(self):
+        self.endpoints = defaultdict(EndpointStats)
+        self._lock = threading.Lock()
+        self.app = None
+
+    def init_app(self, app, engine):
+        self.app = app
+        app.config.setdefault('METRICS_SLOW_REQUEST_MS', None)
+        app.config.setdefault('METRICS_N_PLUS_ONE_THRESHOLD', 5)
+        app.config.setdefault('METRICS_PROFILE_ENDPOINTS', [])
+        app.config.setdefault('METRICS_PROFILE_DIR', os.path.join(app.instance_path, 'profiles'))
+        app.before_request(self._start_request)
+        app.teardown_request(self._finish_request)
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _start_request(self):
+        g.metrics_started = time.perf_counter()
+        g.metrics_statements = Counter()
+        g.metrics_sql_seconds = 0.0
+        g.metrics_profiler = None
+        if request.endpoint in self.app.config['METRICS_PROFILE_ENDPOINTS']:
+            g.metrics_profiler = cProfile.Profile()
+            g.metrics_profiler.enable()
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and 'metrics_statements' in g:
+            conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and 'metrics_statements' in g and conn.info.get('metrics_query_start'):
+            g.metrics_sql_seconds += time.perf_counter() - conn.info['metrics_query_start'].pop()
+            g.metrics_statements[statement] += 1
+
+    def _finish_request(self, exc=None):
+        if 'metrics_started' not in g:
+            return
+        elapsed = time.perf_counter() - g.metrics_started
+        endpoint = request.endpoint or 'unknown'
+        statements = g.metrics_statements
+        repeated = [sql for sql, count in statements.items()
+                    if count >= self.app.config['METRICS_N_PLUS_ONE_THRESHOLD']]
+        with self._lock:
+            stats = self.endpoints[endpoint]
+            stats.requests += 1
+            stats.latency_sum += elapsed
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if elapsed <= bound:
+                    stats.buckets[i] += 1
+            stats.sql_statements += sum(statements.values())
+            stats.sql_seconds += g.metrics_sql_seconds
+            if repeated:
+                stats.n_plus_one += 1
+        for sql in repeated:
+            self.app.logger.warning("Possible N+1 on %s: %d x %s", endpoint, statements[sql], sql)
+        slow_ms = self.app.config['METRICS_SLOW_REQUEST_MS']
+        if slow_ms is not None and elapsed * 1000 >= slow_ms:
+            self.app.logger.warning("Slow request %s %s took %.1f ms with %d SQL statements",
+                                    request.method, request.path, elapsed * 1000, sum(statements.values()))
+        if g.metrics_profiler is not None:
+            g.metrics_profiler.disable()
+            os.makedirs(self.app.config['METRICS_PROFILE_DIR'], exist_ok=True)
+            filename = f"{endpoint}-{int(time.time() * 1000)}.prof"
+            g.metrics_profiler.dump_stats(os.path.join(self.app.config['METRICS_PROFILE_DIR'], filename))
+
+    def render(self, extra=None):
+        with self._lock:
+            endpoints = sorted(self.endpoints.items())
+            lines = ['# TYPE http_request_duration_seconds histogram']
+            for endpoint, stats in endpoints:
+                label = f'endpoint="{endpoint}"'
+                for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+                    lines.append(f'http_request_duration_seconds_bucket{{{label},le="{bound}"}} {count}')
+                lines.append(f'http_request_duration_seconds_bucket{{{label},le="+Inf"}} {stats.requests}')
+                lines.append(f'http_request_duration_seconds_sum{{{label}}} {stats.latency_sum:.6f}')
+                lines.append(f'http_request_duration_seconds_count{{{label}}} {stats.requests}')
+            for name, field in (('sql_statements_total', 'sql_statements'),
+                                ('sql_duration_seconds_total', 'sql_seconds'),
+                                ('n_plus_one_requests_total', 'n_plus_one')):
+                lines.append(f'# TYPE {name} counter')
+                for endpoint, stats in endpoints:
+                    lines.append(f'{name}{{endpoint="{endpoint}"}} {getattr(stats, field)}')
+        for name, value in (extra or {}).items():
+            lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self.endpoints.clear()
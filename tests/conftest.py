@@ -0,0 +1,46 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Point the app at a throwaway file database before it is imported, so tests never touch instance/.
+DB_DIR = tempfile.mkdtemp(prefix='parking-tests-')
+os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(DB_DIR, 'test.sqlite3')}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as parking
+
+@pytest.fixture(scope='session')
+def m():
+    with parking.app.app_context():
+        parking.init_db()
+    return parking
+
+@pytest.fixture
+def make_lot(m):
+    def make(spots, price=20.0, name='Test Lot'):
+        with m.app.app_context():
+            lot = m.ParkingLot(prime_location_name=name, address='Test Road', pincode='600001', price_per_hour=price,
+                               max_spots=spots, occupied_count=0, available_count=spots, active_reservation_count=0)
+            m.db.session.add(lot)
+            m.db.session.flush()
+            m.provision_spots(lot.lot_id, spots)
+            m.db.session.commit()
+            return lot.lot_id
+    return make
+
+@pytest.fixture
+def make_users(m):
+    counter = [0]
+
+    def make(count):
+        with m.app.app_context():
+            start = counter[0]
+            counter[0] += count
+            users = [m.User(email=f"user{start + i}-{id(counter)}@test", password='x', name=f"User {i}",
+                            address='Test', pincode=600001) for i in range(count)]
+            m.db.session.add_all(users)
+            m.db.session.commit()
+            return [user.u_id for user in users]
+    return make
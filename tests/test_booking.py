@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pytest
+
+THREADS = 8
+
+def run_threads(m, chunks, work):
+    errors = []
+
+    def worker(chunk):
+        with m.app.app_context():
+            for item in chunk:
+                try:
+                    work(item)
+                except Exception as e:
+                    errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, errors
+
+def open_spot_ids(m, lot_id):
+    with m.app.app_context():
+        return [row.spot_id for row in m.db.session.query(m.Reservation.spot_id)
+                .join(m.ParkingSpot, m.Reservation.spot_id == m.ParkingSpot.spot_id)
+                .filter(m.ParkingSpot.lot_id == lot_id, m.Reservation.leaving_timestamp.is_(None))]
+
+def test_concurrent_bookings_never_share_a_spot(m, make_lot, make_users, capsys):
+    lot_id = make_lot(spots=50)
+    user_ids = make_users(200)
+    booked = []
+
+    def book(user_id):
+        reservation = m.reserve_spot(user_id, lot_id, f"TN{user_id}")
+        if reservation is not None:
+            booked.append(reservation.spot_id)
+
+    elapsed, errors = run_threads(m, [user_ids[i::THREADS] for i in range(THREADS)], book)
+    assert errors == []
+    spot_ids = open_spot_ids(m, lot_id)
+    assert len(booked) == 50
+    assert sorted(spot_ids) == sorted(booked)
+    assert len(set(spot_ids)) == len(spot_ids)
+    with m.app.app_context():
+        assert m.rebuild_lot_counters(repair=False) == []
+        lot = m.db.session.get(m.ParkingLot, lot_id)
+        assert (lot.occupied_count, lot.available_count, lot.active_reservation_count) == (50, 0, 50)
+    with capsys.disabled():
+        print(f"\n{len(user_ids)} booking attempts on {THREADS} threads: {len(user_ids) / elapsed:.0f} bookings/sec")
+
+def test_concurrent_book_and_release_keeps_counters(m, make_lot, make_users):
+    lot_id = make_lot(spots=10)
+    user_ids = make_users(THREADS)
+
+    def cycle(user_id):
+        for _ in range(20):
+            reservation = m.reserve_spot(user_id, lot_id, f"TN{user_id}")
+            if reservation is not None:
+                m.release_spot(reservation.res_id)
+
+    elapsed, errors = run_threads(m, [[user_id] for user_id in user_ids], cycle)
+    assert errors == []
+    assert open_spot_ids(m, lot_id) == []
+    with m.app.app_context():
+        assert m.rebuild_lot_counters(repair=False) == []
+        assert m.ParkingSpot.query.filter_by(lot_id=lot_id, status='O').count() == 0
+
+def test_release_bills_the_current_lot_price(m, make_lot, make_users):
+    lot_id = make_lot(spots=1, price=10.0)
+    [user_id] = make_users(1)
+    with m.app.app_context():
+        reservation = m.reserve_spot(user_id, lot_id, 'TN01')
+        res_id = reservation.res_id
+        m.Reservation.query.filter_by(res_id=res_id).update(
+            {m.Reservation.parking_timestamp: m.datetime.utcnow() - m.timedelta(hours=2)})
+        m.db.session.commit()
+        m.get_lot(lot_id)
+        # Another worker reprices the lot; this process still holds the old snapshot in its cache.
+        m.ParkingLot.query.filter_by(lot_id=lot_id).update({m.ParkingLot.price_per_hour: 50.0})
+        m.db.session.commit()
+        assert m.get_lot(lot_id)['price_per_hour'] == 10.0
+        m.release_spot(res_id)
+        assert m.db.session.get(m.Reservation, res_id).total_cost == pytest.approx(100.0, abs=0.5)
+
+def test_booking_page_shows_the_lot_not_a_spot(m, make_lot, make_users):
+    lot_id = make_lot(spots=1, name='Preview Lot')
+    [user_id] = make_users(1)
+    client = m.app.test_client()
+    with client.session_transaction() as session:
+        session['u_id'] = user_id
+    response = client.get(f"/user/book/{lot_id}")
+    assert response.status_code == 200
+    assert b'Preview Lot' in response.data and b'Spot ID' not in response.data
+    assert client.post(f"/user/book/{lot_id}", data=dict(vehicle_no='TN01')).status_code == 302
+    assert client.get(f"/user/book/{lot_id}").status_code == 302
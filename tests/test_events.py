@@ -0,0 +1,24 @@
+from events import SpotEventBroker
+
+def test_since_returns_events_after_the_id():
+    broker = SpotEventBroker()
+    first = broker.publish('spot', spot_id=1)
+    broker.publish('spot', spot_id=2)
+    assert [event[0] for event in broker.since(first)] == [first + 1]
+    assert broker.since(broker.last_id) == []
+
+def test_since_asks_for_a_reset_when_the_buffer_no_longer_reaches_back():
+    broker = SpotEventBroker(maxlen=2)
+    for spot_id in range(4):
+        broker.publish('spot', spot_id=spot_id)
+    assert broker.since(1) is None
+
+def test_resume_id_ahead_of_the_broker_resets_the_stream():
+    # A restarted worker, or a different one, has a lower counter than the id the browser resumes from.
+    broker = SpotEventBroker()
+    broker.publish('spot', spot_id=1)
+    broker.publish('spot', spot_id=2)
+    assert broker.since(57, timeout=0.01) is None
+    stream = broker.stream(57, heartbeat=0.01)
+    assert next(stream) == "retry: 3000\n\n"
+    assert next(stream) == "id: 2\nevent: reset\ndata: {}\n\n"
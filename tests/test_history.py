@@ -0,0 +1,48 @@
+def test_history_survives_lot_deletion(m, make_lot, make_users):
+    lot_id = make_lot(spots=2, name='Doomed Lot')
+    [user_id] = make_users(1)
+    with m.app.app_context():
+        for vehicle_no in ('TN01', 'TN02'):
+            m.release_spot(m.reserve_spot(user_id, lot_id, vehicle_no).res_id)
+    admin = m.app.test_client()
+    with admin.session_transaction() as session:
+        session['user_role'] = 'admin'
+    assert admin.post(f"/delete_parking_lot/{lot_id}").status_code == 302
+    with m.app.app_context():
+        assert m.db.session.get(m.ParkingLot, lot_id) is None
+        rows, _ = m.get_parking_history(user_id)
+        assert [row.vehicle_no for row in rows] == ['TN02', 'TN01']
+        assert all(row.location is None for row in rows)
+        assert m.user_usage(user_id)['total_bookings'] == 2
+        assert m.archive_reservations(older_than_days=-1) >= 2
+        rows, _ = m.get_parking_history(user_id)
+        assert len(rows) == 2
+        assert m.user_usage(user_id)['total_bookings'] == 2
+
+def test_shrinking_a_lot_removes_spots_with_history(m, make_lot, make_users):
+    lot_id = make_lot(spots=4, name='Shrinking Lot')
+    [user_id] = make_users(1)
+    with m.app.app_context():
+        # One past booking per spot, then one spot left occupied.
+        for vehicle_no in ('TN01', 'TN02', 'TN03', 'TN04'):
+            m.reserve_spot(user_id, lot_id, vehicle_no)
+        for res_id, in m.db.session.query(m.Reservation.res_id).join(m.ParkingSpot).filter(m.ParkingSpot.lot_id == lot_id):
+            m.release_spot(res_id)
+        occupied_spot = m.reserve_spot(user_id, lot_id, 'TN05').spot_id
+    admin = m.app.test_client()
+    with admin.session_transaction() as session:
+        session['user_role'] = 'admin'
+    form = dict(prime_location_name='Shrinking Lot', address='Test Road', pincode='600001', price_per_hour='20')
+    assert admin.post(f"/edit_parking_lot/{lot_id}", data=dict(form, max_spots='2')).status_code == 302
+    with m.app.app_context():
+        lot = m.db.session.get(m.ParkingLot, lot_id)
+        assert (lot.max_spots, lot.available_count, lot.occupied_count) == (2, 1, 1)
+        assert m.ParkingSpot.query.filter_by(lot_id=lot_id).count() == 2
+        assert m.user_usage(user_id)['total_bookings'] == 5
+    assert admin.post(f"/edit_parking_lot/{lot_id}", data=dict(form, max_spots='0')).status_code == 302
+    with admin.session_transaction() as session:
+        assert ('warning', '1 occupied spots could not be removed') in session['_flashes']
+    with m.app.app_context():
+        lot = m.db.session.get(m.ParkingLot, lot_id)
+        assert (lot.max_spots, lot.available_count) == (1, 0)
+        assert m.db.session.get(m.ParkingSpot, occupied_spot).status == 'O'
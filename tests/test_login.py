@@ -0,0 +1,33 @@
+def test_login_is_one_query_and_keeps_the_profile_out_of_the_cookie(m):
+    with m.app.app_context():
+        user = m.User(email='login@test', password=m.hash_password('secret'), name='Login User',
+                      address='Private Road', pincode=600042)
+        m.db.session.add(user)
+        m.db.session.commit()
+        u_id = user.u_id
+        client = m.app.test_client()
+        responses = []
+        statements = m.capture_statements(
+            lambda: responses.append(client.post('/login', data=dict(email='login@test', password='secret'))))
+    assert responses[0].status_code == 302
+    assert len(statements) == 1
+    with client.session_transaction() as session:
+        assert session['current_user'] == {'u_id': u_id, 'name': 'Login User'}
+        assert 'Private Road' not in repr(dict(session)) and 'login@test' not in repr(dict(session))
+    response = client.get('/edit_profile')
+    assert b'Private Road' in response.data and b'login@test' in response.data
+
+def test_admin_identity_is_tried_first(m):
+    with m.app.app_context():
+        m.db.session.add(m.User(email='abc@gmail.com', password=m.hash_password('Shreya@123'), name='Shadow',
+                                address='Test', pincode=600001))
+        m.db.session.commit()
+        try:
+            assert [identity.role for identity in m.find_identities('abc@gmail.com')] == ['admin', 'user']
+            client = m.app.test_client()
+            client.post('/login', data=dict(email='abc@gmail.com', password='Shreya@123'))
+            with client.session_transaction() as session:
+                assert session['user_role'] == 'admin' and 'u_id' not in session
+        finally:
+            m.User.query.filter_by(email='abc@gmail.com').delete()
+            m.db.session.commit()
@@ -0,0 +1,34 @@
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_shipped_database_migrates_to_latest(m, tmp_path):
+    # The shipped database still has the original schema; every migration has to apply on top of it.
+    path = tmp_path / 'shipped.sqlite3'
+    shutil.copy(os.path.join(ROOT, 'instance', 'database.sqlite3'), path)
+    with sqlite3.connect(path) as conn:
+        conn.execute("INSERT INTO parking_lot (lot_id, prime_location_name, price_per_hour, address, pincode, max_spots) "
+                     "VALUES (1, 'Old Lot', 20, 'Old Road', '600001', 3)")
+        conn.executemany("INSERT INTO parking_spot (spot_id, lot_id, status) VALUES (?, 1, ?)",
+                         [(1, 'O'), (2, 'A'), (3, 'A')])
+        conn.execute("INSERT INTO user (u_id, email, password, name, address, pincode) "
+                     "VALUES (1, 'old@test', 'x', 'Old', 'Old Road', 600001)")
+        conn.executemany("INSERT INTO reservation (spot_id, user_id, parking_timestamp, leaving_timestamp, total_cost, vehicle_no) "
+                         "VALUES (?, 1, ?, ?, ?, ?)",
+                         [(2, '2025-01-01 04:00:00', '2025-01-01 06:00:00', 40.0, 'TN01'),
+                          (1, '2025-01-02 04:00:00', None, None, 'TN02')])
+    env = dict(os.environ, FLASK_SQLALCHEMY_DATABASE_URI=f"sqlite:///{path}")
+    result = subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'migrate'],
+                            cwd=ROOT, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert f"version {len(m.MIGRATIONS)}" in result.stdout
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == len(m.MIGRATIONS)
+        assert conn.execute("SELECT occupied_count, available_count, active_reservation_count FROM parking_lot").fetchone() == (1, 2, 1)
+        assert conn.execute("SELECT lot_id, day, revenue, reservation_count FROM lot_revenue").fetchall() == [(1, '2025-01-01', 40.0, 1)]
+        assert conn.execute("SELECT revenue_total FROM parking_lot").fetchone() == (40.0,)
+        assert conn.execute("SELECT rowid FROM lot_search WHERE lot_search MATCH 'Old'").fetchall() == [(1,)]
@@ -0,0 +1,35 @@
+import json
+
+import pytest
+
+import billing
+import bulk
+
+BAD_RULES = [[1], {"tiers": [[2]]}, {"tiers": [[2, "x"]]}, {"peak": {"windows": [[22, 6]], "multiplier": 1.5}},
+             {"peak": {"windows": [[8, 25]], "multiplier": 1.5}}, {"peak": {"windows": [[8, 10]]}}]
+
+@pytest.mark.parametrize('rules', BAD_RULES)
+def test_bad_rules_are_rejected(rules):
+    with pytest.raises(ValueError):
+        billing.validate_rules(rules)
+    with pytest.raises(ValueError):
+        bulk.clean_lot({'name': 'Lot', 'address': 'Road', 'pincode': '600001', 'price': '20', 'spots': '1',
+                        'pricing_rules': json.dumps(rules)})
+
+def test_good_rules_are_accepted():
+    rules = {"tiers": [[2, 0.8], [6, 0.5]], "peak": {"windows": [[0, 6], [22, 24]], "multiplier": 1.5}}
+    assert billing.validate_rules(rules) is rules
+
+def test_edit_lot_flashes_bad_rules(m, make_lot):
+    lot_id = make_lot(spots=1, name='Rules Lot')
+    admin = m.app.test_client()
+    with admin.session_transaction() as session:
+        session['user_role'] = 'admin'
+    form = dict(max_spots='1', prime_location_name='Rules Lot', address='Test Road', pincode='600001',
+                price_per_hour='20', pricing_rules='{"tiers": [[2]]}')
+    response = admin.post(f"/edit_parking_lot/{lot_id}", data=form)
+    assert response.status_code == 200
+    with admin.session_transaction() as session:
+        assert session['_flashes'][-1][1].startswith('Invalid pricing rules')
+    with m.app.app_context():
+        assert m.db.session.get(m.ParkingLot, lot_id).pricing_rules is None
@@ -0,0 +1,67 @@
+import pytest
+
+# Tables a route may read in full because it lists every row of them by design.
+ROUTES = [
+    ('user', '/user', {'parking_lot'}),
+    ('user', '/user?location=Te', {'parking_lot'}),
+    ('user', '/user?location=Test', set()),
+    ('user', '/user/book/{lot_id}', set()),
+    ('user', '/user/summary', set()),
+    ('user', '/user/history.csv', set()),
+    ('user', '/api/v1/lots', {'parking_lot'}),
+    ('user', '/api/v1/lots/{lot_id}', set()),
+    ('user', '/api/v1/me/history', set()),
+    ('user', '/api/v1/me/summary', set()),
+    ('admin', '/admin_dashboard', {'parking_lot', 'parking_spot'}),
+    ('admin', '/admin/summary', {'parking_lot'}),
+    ('admin', '/admin/search?filter_by=pincode&search_query=60', set()),
+    ('admin', '/admin/search?filter_by=location&search_query=Test', set()),
+    ('admin', '/admin/users', {'user'}),
+]
+
+@pytest.fixture(scope='module')
+def seeded(m):
+    with m.app.app_context():
+        lot = m.ParkingLot(prime_location_name='Test Plaza', address='Test Road', pincode='600123', price_per_hour=10.0,
+                           max_spots=4, occupied_count=0, available_count=4, active_reservation_count=0)
+        m.db.session.add(lot)
+        m.db.session.flush()
+        m.provision_spots(lot.lot_id, 4)
+        user = m.User(email='plans@test', password='x', name='Plans', address='Test', pincode=600123)
+        m.db.session.add(user)
+        m.db.session.commit()
+        lot_id, user_id = lot.lot_id, user.u_id
+        reservation = m.reserve_spot(user_id, lot_id, 'TN01')
+        m.release_spot(reservation.res_id)
+        reservation = m.reserve_spot(user_id, lot_id, 'TN02')
+        return {'lot_id': lot_id, 'user_id': user_id, 'res_id': reservation.res_id}
+
+def client_for(m, role, seeded):
+    client = m.app.test_client()
+    with client.session_transaction() as session:
+        if role == 'admin':
+            session['user_role'] = 'admin'
+            session['admin_id'] = 1
+        else:
+            session['u_id'] = seeded['user_id']
+    return client
+
+def table_of(scan):
+    return scan.split()[1]
+
+def test_hot_paths_use_indexes(m, seeded):
+    with m.app.app_context():
+        assert m.query_plan_scans(m.hot_paths(seeded['lot_id'], seeded['user_id'], 'plans@test')) == {}
+
+@pytest.mark.parametrize('role,path,allowed', ROUTES)
+def test_route_queries_use_indexes(m, seeded, role, path, allowed):
+    client = client_for(m, role, seeded)
+    url = path.format(**seeded)
+    with m.app.app_context():
+        m.lot_cache.clear()
+        responses = []
+        statements = m.capture_statements(lambda: responses.append(client.get(url)))
+        assert responses[0].status_code == 200
+        scans = [scan for statement, parameters in statements for scan in m.statement_scans(statement, parameters)
+                 if table_of(scan) not in allowed]
+    assert scans == []
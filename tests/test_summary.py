@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+def summary_queries(m, user_id):
+    client = m.app.test_client()
+    with client.session_transaction() as session:
+        session['u_id'] = user_id
+    statements = []
+
+    def count(*args):
+        statements.append(args[2])
+
+    with m.app.app_context():
+        engine = m.db.engine
+    event.listen(engine, 'after_cursor_execute', count)
+    try:
+        response = client.get('/user/summary')
+    finally:
+        event.remove(engine, 'after_cursor_execute', count)
+    assert response.status_code == 200
+    return len(statements)
+
+def test_user_summary_query_count_is_constant(m, make_lot, make_users):
+    lot_id = make_lot(spots=5)
+    counts = []
+    for size in (1, 50, 500):
+        [user_id] = make_users(1)
+        with m.app.app_context():
+            spot_ids = [row.spot_id for row in m.db.session.query(m.ParkingSpot.spot_id).filter_by(lot_id=lot_id)]
+            start = datetime.utcnow() - timedelta(days=90)
+            m.db.session.add_all([m.Reservation(spot_id=spot_ids[i % len(spot_ids)], user_id=user_id, vehicle_no=f"TN{i}",
+                                                parking_timestamp=start + timedelta(hours=i),
+                                                leaving_timestamp=start + timedelta(hours=i, minutes=30), total_cost=10.0)
+                                  for i in range(size)])
+            m.db.session.commit()
+        counts.append(summary_queries(m, user_id))
+    assert len(set(counts)) == 1, counts
+
+def test_admin_summary_revenue_comes_from_lot_totals(m, make_lot, make_users):
+    lot_id = make_lot(spots=2, price=30.0, name='Revenue Lot')
+    [user_id] = make_users(1)
+    with m.app.app_context():
+        for vehicle_no in ('TN01', 'TN02'):
+            m.release_spot(m.reserve_spot(user_id, lot_id, vehicle_no).res_id)
+        ledger = m.db.session.query(m.func.sum(m.LotRevenue.revenue)).filter_by(lot_id=lot_id).scalar()
+        assert m.db.session.get(m.ParkingLot, lot_id).revenue_total == pytest.approx(ledger)
+        client = m.app.test_client()
+        with client.session_transaction() as session:
+            session['user_role'] = 'admin'
+        responses = []
+        statements = m.capture_statements(lambda: responses.append(client.get('/admin/summary')))
+    assert responses[0].status_code == 200
+    assert not any('FROM lot_revenue' in statement for statement, _ in statements)